@@ -4,19 +4,59 @@ Multi-Agent Churn Demo - Hour 1: Data Generation
 Creates 4 tables with 10K realistic records for the churn analysis demo.
 """
 
+import os
+
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from langchain_snowflake import create_session_from_env
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Set seeds for reproducible results
-random.seed(42)
-np.random.seed(42)
+# Seed for reproducible results; main() derives every generator's RNG from it
+SEED = 42
+
+# Rows per staged Parquet file when bulk loading tables
+BATCH_SIZE = 16000
+
+# Demo timeline: signups from START_DATE to DATA_END_DATE, churn spike after RECENT_CUTOFF
+START_DATE = np.datetime64('2022-01-01')
+DATA_END_DATE = np.datetime64('2024-10-01')
+RECENT_CUTOFF = np.datetime64('2024-07-01')  # Last 3 months
+USAGE_END_DATE = min(DATA_END_DATE, np.datetime64(datetime.now().date(), 'D'))
+
+# Low-cardinality columns are generated as integer codes and stored as pandas
+# Categoricals, which write_pandas stages as dictionary-encoded Parquet
+PLAN_TYPES = np.array(['starter', 'professional', 'enterprise', 'premium'])
+
+# Usage volume per plan, aligned with PLAN_TYPES
+PLAN_MULTIPLIER = np.array([0.7, 1.0, 1.5, 2.0])
+
+FEATURES = np.array([
+    'dashboard_view', 'report_generation', 'data_export', 'user_management',
+    'api_calls', 'integrations', 'analytics', 'collaboration', 'mobile_app'
+])
+
+# Typical session minutes per feature, aligned with FEATURES
+BASE_DURATION = np.array([15, 45, 30, 20, 5, 60, 90, 35, 10], dtype=np.int32)
+
+PLAN_FEATURES = {
+    'starter': ['dashboard_view', 'report_generation', 'mobile_app'],
+    'professional': ['dashboard_view', 'report_generation', 'data_export', 'analytics', 'mobile_app'],
+    'enterprise': ['dashboard_view', 'report_generation', 'data_export', 'user_management', 
+                  'api_calls', 'integrations', 'analytics', 'collaboration'],
+    'premium': list(FEATURES)
+}
+
+# Feature codes per plan code; only the first PLAN_FEATURE_COUNTS[plan] entries of a row are used
+PLAN_FEATURE_COUNTS = np.array([len(PLAN_FEATURES[plan_type]) for plan_type in PLAN_TYPES])
+PLAN_FEATURE_TABLE = np.array([
+    np.resize(np.flatnonzero(np.isin(FEATURES, PLAN_FEATURES[plan_type])), len(FEATURES))
+    for plan_type in PLAN_TYPES
+])
 
 def main():
     print("🚀 Starting Hour 1: Data Generation")
@@ -24,7 +64,10 @@ def main():
     
     # Initialize Snowflake session
     session = create_session_from_env()
-    print(f"✅ Connected to Snowflake: {session.get_current_database()}.{session.get_current_schema()}")
+    # The session was opened with these env values; only ask Snowflake when they are unset
+    database = os.getenv("SNOWFLAKE_DATABASE") or session.get_current_database()
+    schema = os.getenv("SNOWFLAKE_SCHEMA") or session.get_current_schema()
+    print(f"✅ Connected to Snowflake: {database}.{schema}")
     
     # Step 1: Create Tables
     print("\n📋 Step 1: Creating Tables...")
@@ -32,17 +75,36 @@ def main():
     
     # Step 2: Generate and Insert Data
     print("\n📊 Step 2: Generating Data...")
-    customers_data = generate_customers_data(10000)
-    insert_customers_data(session, customers_data)
-    
-    usage_events_data = generate_usage_events(customers_data[:2000])  # Subset for speed
-    insert_usage_events_data(session, usage_events_data)
-    
-    support_tickets_data = generate_support_tickets(customers_data)
-    insert_support_tickets_data(session, support_tickets_data)
-    
-    churn_events_data = generate_churn_events(customers_data)
-    insert_churn_events_data(session, churn_events_data)
+    rng = np.random.default_rng(SEED)
+    customers_data = generate_customers_data(rng, 10000)
+    
+    # The other generators only read customers, so run them in worker processes
+    # (each with an independent child RNG stream) while CUSTOMERS loads
+    usage_rng, tickets_rng, churn_rng = (
+        np.random.default_rng(seed) for seed in np.random.SeedSequence(SEED).spawn(3)
+    )
+    
+    with ProcessPoolExecutor(max_workers=2) as generators, ThreadPoolExecutor(max_workers=3) as loaders:
+        pending = {
+            generators.submit(generate_support_tickets, customers_data, tickets_rng): insert_support_tickets_data,
+            generators.submit(generate_churn_events, customers_data, churn_rng): insert_churn_events_data
+        }
+        
+        # Usage events are the largest table: stream them batch by batch straight into the load
+        inserts = [loaders.submit(
+            insert_usage_events_data, session,
+            generate_usage_events(customers_data.iloc[:2000], usage_rng)  # Subset for speed
+        )]
+        
+        insert_customers_data(session, customers_data)
+        
+        # Remaining tables only depend on CUSTOMERS; load each as soon as its data is ready
+        inserts += [
+            loaders.submit(pending[generated], session, generated.result())
+            for generated in as_completed(pending)
+        ]
+        for insert in inserts:
+            insert.result()
     
     # Step 3: Validate Data
     print("\n🔍 Step 3: Validating Data...")
@@ -54,10 +116,17 @@ def main():
 def create_tables(session):
     """Create the 4 core tables."""
     
-    # Grant ownership on the schema to the current role
-    current_role = session.sql("SELECT CURRENT_ROLE()").collect()[0][0]
-    session.sql(f"GRANT OWNERSHIP ON SCHEMA PUBLIC TO ROLE {current_role}").collect()
-    print(f"✅ Granted ownership on schema PUBLIC to role {current_role}")
+    # Grant ownership on the schema to the current role (unless it already owns it)
+    schema_owner, current_role = session.sql("""
+        SELECT
+            (SELECT schema_owner FROM INFORMATION_SCHEMA.SCHEMATA WHERE schema_name = 'PUBLIC'),
+            CURRENT_ROLE()
+    """).collect()[0]
+    if schema_owner != current_role:
+        session.sql(f"GRANT OWNERSHIP ON SCHEMA PUBLIC TO ROLE {current_role}").collect()
+        print(f"✅ Granted ownership on schema PUBLIC to role {current_role}")
+    else:
+        print(f"✅ Schema PUBLIC already owned by role {current_role}")
     
     tables = {
         "CUSTOMERS": """
@@ -114,152 +183,131 @@ def create_tables(session):
         """
     }
     
-    for table_name, ddl in tables.items():
-        session.sql(ddl).collect()
+    # Submit all DDL asynchronously, then wait for each to finish
+    query_jobs = {table_name: session.sql(ddl).collect_nowait() for table_name, ddl in tables.items()}
+    for table_name, query_job in query_jobs.items():
+        query_job.result()
         print(f"✅ {table_name} table created")
 
-def generate_customers_data(num_customers=10000):
+def generate_customers_data(rng, num_customers=10000):
     """Generate realistic customer data."""
     
-    plan_types = ['starter', 'professional', 'enterprise', 'premium']
-    plan_weights = [0.4, 0.35, 0.15, 0.1]
-    
-    company_sizes = ['small', 'medium', 'large', 'enterprise']
+    company_sizes = np.array(['small', 'medium', 'large', 'enterprise'])
     size_weights = [0.5, 0.3, 0.15, 0.05]
     
-    industries = [
+    industries = np.array([
         'technology', 'healthcare', 'finance', 'retail', 'manufacturing',
         'education', 'consulting', 'media', 'real_estate', 'non_profit'
-    ]
-    
-    revenue_base = {
-        'starter': {'small': 29, 'medium': 49, 'large': 99, 'enterprise': 199},
-        'professional': {'small': 99, 'medium': 199, 'large': 399, 'enterprise': 799},
-        'enterprise': {'small': 299, 'medium': 599, 'large': 1199, 'enterprise': 2399},
-        'premium': {'small': 599, 'medium': 1199, 'large': 2399, 'enterprise': 4799}
-    }
-    
-    customers = []
-    start_date = datetime(2022, 1, 1)
-    end_date = datetime(2024, 10, 1)
-    
-    for i in range(num_customers):
-        customer_id = f"CUST_{i+1:06d}"
-        
-        # Generate signup date
-        days_range = (end_date - start_date).days
-        random_days = random.randint(0, days_range)
-        signup_date = start_date + timedelta(days=random_days)
-        
-        # Select company size and correlated plan type
-        company_size = np.random.choice(company_sizes, p=size_weights)
-        
-        if company_size == 'enterprise':
-            plan_weights_adj = [0.1, 0.2, 0.4, 0.3]
-        elif company_size == 'large':
-            plan_weights_adj = [0.2, 0.4, 0.3, 0.1]
-        elif company_size == 'medium':
-            plan_weights_adj = [0.3, 0.4, 0.2, 0.1]
-        else:  # small
-            plan_weights_adj = [0.6, 0.3, 0.08, 0.02]
-        
-        plan_type = np.random.choice(plan_types, p=plan_weights_adj)
-        industry = random.choice(industries)
-        
-        # Calculate revenue with variance
-        base_revenue = revenue_base[plan_type][company_size]
-        revenue_variance = random.uniform(0.8, 1.2)
-        monthly_revenue = round(base_revenue * revenue_variance, 2)
-        
-        customers.append({
-            'customer_id': customer_id,
-            'signup_date': signup_date.strftime('%Y-%m-%d'),
-            'plan_type': plan_type,
-            'company_size': company_size,
-            'industry': industry,
-            'status': 'active',
-            'monthly_revenue': monthly_revenue
-        })
+    ])
+    
+    # Plan mix correlated with company size (rows: company size, cols: plan type)
+    plan_weights_by_size = np.array([
+        [0.6, 0.3, 0.08, 0.02],  # small
+        [0.3, 0.4, 0.2, 0.1],    # medium
+        [0.2, 0.4, 0.3, 0.1],    # large
+        [0.1, 0.2, 0.4, 0.3],    # enterprise
+    ])
+    
+    # Base monthly revenue (rows: plan type, cols: company size)
+    revenue_base = np.array([
+        [29, 49, 99, 199],        # starter
+        [99, 199, 399, 799],      # professional
+        [299, 599, 1199, 2399],   # enterprise
+        [599, 1199, 2399, 4799],  # premium
+    ], dtype=np.float64)
+    
+    days_range = (DATA_END_DATE - START_DATE).astype(int)
+    
+    # Draw every random column in one shot
+    size_idx = rng.choice(len(company_sizes), size=num_customers, p=size_weights)
+    industry_idx = rng.integers(0, len(industries), num_customers)
+    signup_days = rng.integers(0, days_range + 1, num_customers)
+    revenue_variance = rng.uniform(0.8, 1.2, num_customers)
+    
+    # Sample plan types one company-size group at a time
+    plan_idx = np.empty(num_customers, dtype=int)
+    for size, plan_weights in enumerate(plan_weights_by_size):
+        in_size = np.flatnonzero(size_idx == size)
+        plan_idx[in_size] = rng.choice(len(PLAN_TYPES), size=len(in_size), p=plan_weights)
+    
+    signup_dates = START_DATE + signup_days
+    monthly_revenue = np.round(revenue_base[plan_idx, size_idx] * revenue_variance, 2)
+    
+    customers = pd.DataFrame({
+        'customer_id': 'CUST_' + pd.Series(np.arange(1, num_customers + 1)).astype(str).str.zfill(6),
+        'signup_date': signup_dates,
+        'plan_type': pd.Categorical.from_codes(plan_idx, categories=PLAN_TYPES),
+        'company_size': pd.Categorical.from_codes(size_idx, categories=company_sizes),
+        'industry': pd.Categorical.from_codes(industry_idx, categories=industries),
+        'status': 'active',
+        'monthly_revenue': monthly_revenue
+    })
     
     print(f"✅ Generated {len(customers)} customer records")
     return customers
 
-def generate_usage_events(customers_data, events_per_customer_avg=50):
-    """Generate realistic usage events."""
-    
-    features = [
-        'dashboard_view', 'report_generation', 'data_export', 'user_management',
-        'api_calls', 'integrations', 'analytics', 'collaboration', 'mobile_app'
-    ]
-    
-    plan_features = {
-        'starter': ['dashboard_view', 'report_generation', 'mobile_app'],
-        'professional': ['dashboard_view', 'report_generation', 'data_export', 'analytics', 'mobile_app'],
-        'enterprise': ['dashboard_view', 'report_generation', 'data_export', 'user_management', 
-                      'api_calls', 'integrations', 'analytics', 'collaboration'],
-        'premium': features
-    }
-    
-    usage_events = []
-    event_counter = 1
-    
-    for customer in customers_data:
-        customer_id = customer['customer_id']
-        signup_date = datetime.strptime(customer['signup_date'], '%Y-%m-%d')
-        plan_type = customer['plan_type']
-        
-        plan_multiplier = {'starter': 0.7, 'professional': 1.0, 'enterprise': 1.5, 'premium': 2.0}
-        num_events = int(events_per_customer_avg * plan_multiplier[plan_type] * random.uniform(0.5, 1.5))
-        
-        end_date = min(datetime(2024, 10, 1), datetime.now())
-        days_active = (end_date - signup_date).days
-        
-        if days_active <= 0:
+def generate_usage_events(customers_data, rng, events_per_customer_avg=50, batch_size=BATCH_SIZE):
+    """Generate realistic usage events, yielding DataFrames of roughly batch_size rows."""
+    
+    signup_dates = customers_data['signup_date'].to_numpy(dtype='datetime64[D]')
+    plan_codes = customers_data['plan_type'].cat.codes.to_numpy()
+    customer_ids = customers_data['customer_id'].to_numpy()
+    
+    days_active = (USAGE_END_DATE - signup_dates).astype(int)
+    num_events = (
+        events_per_customer_avg * PLAN_MULTIPLIER[plan_codes] * rng.uniform(0.5, 1.5, len(plan_codes))
+    ).astype(int)
+    num_events[days_active <= 0] = 0
+    
+    # Split customers into blocks of about batch_size events so only one block is expanded at a time
+    event_offsets = np.concatenate(([0], np.cumsum(num_events)))
+    block_starts = np.flatnonzero(np.diff(event_offsets[:-1] // batch_size, prepend=-1))
+    block_ends = np.append(block_starts[1:], len(num_events))
+    
+    for start, end in zip(block_starts, block_ends):
+        block_events = num_events[start:end]
+        total_events = block_events.sum()
+        if not total_events:
             continue
         
-        available_features = plan_features[plan_type]
-        
-        for _ in range(num_events):
-            random_days = random.randint(0, days_active)
-            event_date = signup_date + timedelta(days=random_days)
-            
-            feature_used = random.choice(available_features)
-            
-            base_duration = {
-                'dashboard_view': 15, 'report_generation': 45, 'data_export': 30,
-                'user_management': 20, 'api_calls': 5, 'integrations': 60,
-                'analytics': 90, 'collaboration': 35, 'mobile_app': 10
-            }
-            
-            duration = int(base_duration[feature_used] * random.uniform(0.3, 2.0))
-            actions_count = random.randint(1, max(1, duration // 3))
-            
-            usage_events.append({
-                'event_id': f"EVT_{event_counter:08d}",
-                'customer_id': customer_id,
-                'event_date': event_date.strftime('%Y-%m-%d'),
-                'feature_used': feature_used,
-                'session_duration_minutes': duration,
-                'actions_count': actions_count
-            })
-            
-            event_counter += 1
-    
-    print(f"✅ Generated {len(usage_events)} usage events")
-    return usage_events
+        # Expand to one row per event, then sample everything by integer code
+        event_plans = np.repeat(plan_codes[start:end], block_events)
+        event_dates = (
+            np.repeat(signup_dates[start:end], block_events)
+            + rng.integers(0, np.repeat(days_active[start:end], block_events) + 1)
+        )
+        
+        feature_idx = PLAN_FEATURE_TABLE[event_plans, rng.integers(0, PLAN_FEATURE_COUNTS[event_plans])]
+        duration = (BASE_DURATION[feature_idx] * rng.uniform(0.3, 2.0, total_events)).astype(np.int32)
+        actions_count = rng.integers(1, np.maximum(1, duration // 3) + 1)
+        
+        # Event IDs continue across blocks
+        event_numbers = np.arange(event_offsets[start] + 1, event_offsets[end] + 1)
+        
+        yield pd.DataFrame({
+            'event_id': 'EVT_' + pd.Series(event_numbers).astype(str).str.zfill(8),
+            'customer_id': np.repeat(customer_ids[start:end], block_events),
+            'event_date': np.datetime_as_string(event_dates, unit='D'),
+            'feature_used': pd.Categorical.from_codes(feature_idx, categories=FEATURES),
+            'session_duration_minutes': duration,
+            'actions_count': actions_count
+        })
+    
+    print(f"✅ Generated {event_offsets[-1]} usage events")
 
-def generate_support_tickets(customers_data, tickets_per_customer_avg=3):
+def generate_support_tickets(customers_data, rng, tickets_per_customer_avg=3):
     """Generate realistic support tickets with text for sentiment analysis."""
     
-    categories = [
+    categories = np.array([
         'billing', 'technical_issue', 'feature_request', 'account_access',
         'integration_help', 'data_export', 'performance', 'training', 'bug_report'
-    ]
+    ])
     
-    priorities = ['low', 'medium', 'high', 'urgent']
+    priorities = np.array(['low', 'medium', 'high', 'urgent'])
     priority_weights = [0.4, 0.35, 0.2, 0.05]
+    priority_hours = np.array([48, 24, 8, 2])
     
-    statuses = ['resolved', 'closed', 'pending']
+    statuses = np.array(['resolved', 'closed', 'pending'])
     status_weights = [0.7, 0.25, 0.05]
     
     # Realistic ticket text templates by category
@@ -320,280 +368,185 @@ def generate_support_tickets(customers_data, tickets_per_customer_avg=3):
         ]
     }
     
-    support_tickets = []
-    ticket_counter = 1
-    
-    # Generate tickets for subset of customers
-    customers_with_tickets = random.sample(customers_data, min(len(customers_data), 3000))
-    
-    for customer in customers_with_tickets:
-        customer_id = customer['customer_id']
-        signup_date = datetime.strptime(customer['signup_date'], '%Y-%m-%d')
-        
-        num_tickets = np.random.poisson(tickets_per_customer_avg)
-        if num_tickets == 0:
-            continue
-        
-        for _ in range(min(num_tickets, 10)):
-            days_since_signup = (datetime(2024, 10, 1) - signup_date).days
-            if days_since_signup <= 0:
-                continue
-            
-            random_days = random.randint(1, days_since_signup)
-            ticket_date = signup_date + timedelta(days=random_days)
-            
-            category = random.choice(categories)
-            priority = np.random.choice(priorities, p=priority_weights)
-            status = np.random.choice(statuses, p=status_weights)
-            
-            ticket_text = random.choice(ticket_templates[category])
-            
-            # Resolution time based on priority
-            if status in ['resolved', 'closed']:
-                priority_hours = {'low': 48, 'medium': 24, 'high': 8, 'urgent': 2}
-                base_hours = priority_hours[priority]
-                resolution_time = int(base_hours * random.uniform(0.5, 2.0))
-            else:
-                resolution_time = None
-            
-            # Satisfaction score correlated with resolution time
-            if status in ['resolved', 'closed']:
-                if priority == 'urgent' and resolution_time <= 4:
-                    satisfaction = random.choice([4, 5, 5])
-                elif resolution_time and resolution_time > 72:
-                    satisfaction = random.choice([1, 2, 2, 3])
-                else:
-                    satisfaction = random.choice([2, 3, 3, 4, 4])
-            else:
-                satisfaction = None
-            
-            support_tickets.append({
-                'ticket_id': f"TKT_{ticket_counter:08d}",
-                'customer_id': customer_id,
-                'created_date': ticket_date.strftime('%Y-%m-%d'),
-                'category': category,
-                'priority': priority,
-                'status': status,
-                'resolution_time_hours': resolution_time,
-                'satisfaction_score': satisfaction,
-                'ticket_text': ticket_text
-            })
-            
-            ticket_counter += 1
+    # (category, template) grid so ticket text is picked by index
+    template_grid = np.array([ticket_templates[category] for category in categories], dtype=object)
+    
+    # Generate tickets for subset of customers, picked by row position
+    ticket_rows = rng.choice(len(customers_data), size=min(len(customers_data), 3000), replace=False)
+    customers_with_tickets = customers_data.iloc[ticket_rows]
+    signup_dates = customers_with_tickets['signup_date'].to_numpy(dtype='datetime64[D]')
+    days_since_signup = (DATA_END_DATE - signup_dates).astype(int)
+    
+    num_tickets = rng.poisson(tickets_per_customer_avg, len(customers_with_tickets)).clip(0, 10)
+    num_tickets[days_since_signup <= 0] = 0
+    total_tickets = num_tickets.sum()
+    
+    ticket_dates = (
+        np.repeat(signup_dates, num_tickets) + rng.integers(1, np.repeat(days_since_signup, num_tickets) + 1)
+    )
+    
+    category_idx = rng.integers(0, len(categories), total_tickets)
+    priority_idx = rng.choice(len(priorities), size=total_tickets, p=priority_weights)
+    status_idx = rng.choice(len(statuses), size=total_tickets, p=status_weights)
+    ticket_text = template_grid[category_idx, rng.integers(0, template_grid.shape[1], total_tickets)]
+    
+    # Resolution time based on priority; pending tickets have none
+    is_closed = statuses[status_idx] != 'pending'
+    resolution_time = (priority_hours[priority_idx] * rng.uniform(0.5, 2.0, total_tickets)).astype(int)
+    
+    # Satisfaction score correlated with resolution time
+    fast_urgent = (priorities[priority_idx] == 'urgent') & (resolution_time <= 4)
+    slow = resolution_time > 72
+    satisfaction = np.where(
+        fast_urgent,
+        rng.choice([4, 5, 5], total_tickets),
+        np.where(
+            slow,
+            rng.choice([1, 2, 2, 3], total_tickets),
+            rng.choice([2, 3, 3, 4, 4], total_tickets)
+        )
+    )
+    
+    support_tickets = pd.DataFrame({
+        'ticket_id': 'TKT_' + pd.Series(np.arange(1, total_tickets + 1)).astype(str).str.zfill(8),
+        'customer_id': np.repeat(customers_with_tickets['customer_id'].to_numpy(), num_tickets),
+        'created_date': np.datetime_as_string(ticket_dates, unit='D'),
+        'category': pd.Categorical.from_codes(category_idx, categories=categories),
+        'priority': pd.Categorical.from_codes(priority_idx, categories=priorities),
+        'status': pd.Categorical.from_codes(status_idx, categories=statuses),
+        'resolution_time_hours': pd.Series(resolution_time, dtype='Int64').where(is_closed),
+        'satisfaction_score': pd.Series(satisfaction, dtype='Int64').where(is_closed),
+        'ticket_text': ticket_text.astype(str)
+    })
     
     print(f"✅ Generated {len(support_tickets)} support tickets")
     return support_tickets
 
-def generate_churn_events(customers_data):
+def generate_churn_events(customers_data, rng):
     """Generate churn events with the key business story: spike from 3% to 8%."""
     
-    churn_reasons = [
+    churn_reasons = np.array([
         'pricing_too_high', 'poor_performance', 'missing_features', 
         'competitor_switch', 'business_closure', 'poor_support',
         'technical_issues', 'ease_of_use', 'integration_problems'
-    ]
+    ])
     
     # Historical vs recent churn reason patterns
     historical_reason_weights = [0.15, 0.12, 0.15, 0.20, 0.08, 0.10, 0.08, 0.07, 0.05]
     recent_reason_weights = [0.35, 0.25, 0.10, 0.15, 0.03, 0.05, 0.04, 0.02, 0.01]
     
-    churn_events = []
-    churn_counter = 1
-    
-    # Define time periods
-    recent_cutoff = datetime(2024, 7, 1)  # Last 3 months
-    
     # Split customers by signup date
-    historical_customers = []
-    recent_customers = []
-    
-    for customer in customers_data:
-        signup_date = datetime.strptime(customer['signup_date'], '%Y-%m-%d')
-        if signup_date < recent_cutoff:
-            historical_customers.append(customer)
-        else:
-            recent_customers.append(customer)
+    is_historical = customers_data['signup_date'].to_numpy(dtype='datetime64[D]') < RECENT_CUTOFF
+    historical_rows = np.flatnonzero(is_historical)
     
-    print(f"📊 Historical customers: {len(historical_customers)}, Recent: {len(recent_customers)}")
+    print(f"📊 Historical customers: {len(historical_rows)}, Recent: {len(customers_data) - len(historical_rows)}")
     
     # Generate historical churn (3% rate)
     historical_churn_rate = 0.03
-    historical_churn_count = int(len(historical_customers) * historical_churn_rate)
-    historical_churned = random.sample(historical_customers, historical_churn_count)
-    
-    for customer in historical_churned:
-        customer_id = customer['customer_id']
-        signup_date = datetime.strptime(customer['signup_date'], '%Y-%m-%d')
-        
-        max_days = (recent_cutoff - signup_date).days
-        if max_days <= 30:
-            continue
-        
-        min_days = max(30, max_days // 4)
-        churn_days = random.randint(min_days, max_days)
-        churn_date = signup_date + timedelta(days=churn_days)
-        
-        churn_reason = np.random.choice(churn_reasons, p=historical_reason_weights)
-        
-        churn_events.append({
-            'churn_id': f"CHN_{churn_counter:08d}",
-            'customer_id': customer_id,
-            'churn_date': churn_date.strftime('%Y-%m-%d'),
-            'churn_reason': churn_reason,
-            'days_since_signup': churn_days,
-            'final_plan_type': customer['plan_type'],
-            'final_monthly_revenue': customer['monthly_revenue']
-        })
-        
-        churn_counter += 1
-    
-    # Generate recent churn spike (additional 5% for 8% total)
-    eligible_for_recent_churn = [c for c in historical_customers if c not in historical_churned]
+    historical_churn_count = int(len(historical_rows) * historical_churn_rate)
+    historical_churned_rows = rng.choice(historical_rows, size=historical_churn_count, replace=False)
+    historical_churned = customers_data.iloc[historical_churned_rows]
+    
+    historical_signups = historical_churned['signup_date'].to_numpy(dtype='datetime64[D]')
+    max_days = (RECENT_CUTOFF - historical_signups).astype(int)
+    min_days = np.maximum(30, max_days // 4)
+    churn_days = min_days + (rng.random(historical_churn_count) * (max_days - min_days + 1)).astype(int)
+    
+    historical_events = pd.DataFrame({
+        'customer_id': historical_churned['customer_id'].to_numpy(),
+        'churn_date': np.datetime_as_string(historical_signups + churn_days, unit='D'),
+        'churn_reason': pd.Categorical.from_codes(
+            rng.choice(len(churn_reasons), size=historical_churn_count, p=historical_reason_weights),
+            categories=churn_reasons
+        ),
+        'days_since_signup': churn_days,
+        'final_plan_type': historical_churned['plan_type'].array,
+        'final_monthly_revenue': historical_churned['monthly_revenue'].to_numpy()
+    })[max_days > 30]
+    
+    # Generate recent churn spike (additional 5% for 8% total) among historical customers not yet churned
+    is_eligible = is_historical.copy()
+    is_eligible[historical_churned_rows] = False
+    eligible_rows = np.flatnonzero(is_eligible)
     recent_churn_rate_additional = 0.05  # Additional 5% to reach 8% total
-    recent_churn_count = int(len(eligible_for_recent_churn) * recent_churn_rate_additional)
-    recent_churned = random.sample(eligible_for_recent_churn, min(recent_churn_count, len(eligible_for_recent_churn)))
+    recent_churn_count = int(len(eligible_rows) * recent_churn_rate_additional)
+    recent_churned = customers_data.iloc[
+        rng.choice(eligible_rows, size=min(recent_churn_count, len(eligible_rows)), replace=False)
+    ]
     
-    for customer in recent_churned:
-        customer_id = customer['customer_id']
-        signup_date = datetime.strptime(customer['signup_date'], '%Y-%m-%d')
-        
-        # Churn date in recent period
-        churn_start = recent_cutoff
-        churn_end = datetime(2024, 10, 1)
-        
-        random_days = random.randint(0, (churn_end - churn_start).days)
-        churn_date = churn_start + timedelta(days=random_days)
-        
-        days_since_signup = (churn_date - signup_date).days
-        churn_reason = np.random.choice(churn_reasons, p=recent_reason_weights)
-        
-        churn_events.append({
-            'churn_id': f"CHN_{churn_counter:08d}",
-            'customer_id': customer_id,
-            'churn_date': churn_date.strftime('%Y-%m-%d'),
-            'churn_reason': churn_reason,
-            'days_since_signup': days_since_signup,
-            'final_plan_type': customer['plan_type'],
-            'final_monthly_revenue': customer['monthly_revenue']
-        })
-        
-        churn_counter += 1
+    # Churn date in recent period
+    recent_churn_dates = RECENT_CUTOFF + rng.integers(
+        0, (DATA_END_DATE - RECENT_CUTOFF).astype(int) + 1, len(recent_churned)
+    )
+    recent_signups = recent_churned['signup_date'].to_numpy(dtype='datetime64[D]')
+    
+    recent_events = pd.DataFrame({
+        'customer_id': recent_churned['customer_id'].to_numpy(),
+        'churn_date': np.datetime_as_string(recent_churn_dates, unit='D'),
+        'churn_reason': pd.Categorical.from_codes(
+            rng.choice(len(churn_reasons), size=len(recent_churned), p=recent_reason_weights),
+            categories=churn_reasons
+        ),
+        'days_since_signup': (recent_churn_dates - recent_signups).astype(int),
+        'final_plan_type': recent_churned['plan_type'].array,
+        'final_monthly_revenue': recent_churned['monthly_revenue'].to_numpy()
+    })
+    
+    churn_events = pd.concat([historical_events, recent_events], ignore_index=True)
+    churn_events.insert(
+        0, 'churn_id', 'CHN_' + pd.Series(np.arange(1, len(churn_events) + 1)).astype(str).str.zfill(8)
+    )
     
     print(f"✅ Generated {len(churn_events)} churn events")
     print(f"🚨 Historical churn: {len(historical_churned)}, Recent spike: {len(recent_churned)}")
     return churn_events
 
+def load_dataframe(session, df, table_name):
+    """Bulk load a DataFrame into an existing table (staged Parquet + COPY INTO)."""
+    
+    # Stage datetime columns as Parquet dates so they load into DATE columns
+    date_columns = df.select_dtypes(include='datetime').columns
+    if len(date_columns):
+        df = df.assign(**{column: df[column].dt.date for column in date_columns})
+    
+    session.write_pandas(
+        df,
+        table_name,
+        quote_identifiers=False,
+        chunk_size=BATCH_SIZE,
+        compression="snappy",
+        use_logical_type=True
+    )
+
 def insert_customers_data(session, customers_data):
-    """Insert customer data in batches."""
-    batch_size = 1000
-    
-    for i in range(0, len(customers_data), batch_size):
-        batch = customers_data[i:i + batch_size]
-        
-        values = []
-        for customer in batch:
-            values.append(
-                f"('{customer['customer_id']}', '{customer['signup_date']}', "
-                f"'{customer['plan_type']}', '{customer['company_size']}', "
-                f"'{customer['industry']}', '{customer['status']}', {customer['monthly_revenue']})"
-            )
-        
-        insert_sql = f"""
-        INSERT INTO CUSTOMERS (customer_id, signup_date, plan_type, company_size, industry, status, monthly_revenue)
-        VALUES {', '.join(values)}
-        """
-        
-        session.sql(insert_sql).collect()
-    
+    """Bulk load customer data."""
+    load_dataframe(session, customers_data, "CUSTOMERS")
     print(f"✅ Inserted {len(customers_data)} customers")
 
-def insert_usage_events_data(session, events_data):
-    """Insert usage events in batches."""
-    batch_size = 1000
-    
-    for i in range(0, len(events_data), batch_size):
-        batch = events_data[i:i + batch_size]
-        
-        values = []
-        for event in batch:
-            values.append(
-                f"('{event['event_id']}', '{event['customer_id']}', '{event['event_date']}', "
-                f"'{event['feature_used']}', {event['session_duration_minutes']}, {event['actions_count']})"
-            )
-        
-        insert_sql = f"""
-        INSERT INTO USAGE_EVENTS (event_id, customer_id, event_date, feature_used, session_duration_minutes, actions_count)
-        VALUES {', '.join(values)}
-        """
-        
-        session.sql(insert_sql).collect()
-    
-    print(f"✅ Inserted {len(events_data)} usage events")
+def insert_usage_events_data(session, events_batches):
+    """Bulk load usage events one generated batch at a time."""
+    inserted = 0
+    for events_data in events_batches:
+        load_dataframe(session, events_data, "USAGE_EVENTS")
+        inserted += len(events_data)
+    print(f"✅ Inserted {inserted} usage events")
 
 def insert_support_tickets_data(session, tickets_data):
-    """Insert support tickets in batches."""
-    batch_size = 500
-    
-    for i in range(0, len(tickets_data), batch_size):
-        batch = tickets_data[i:i + batch_size]
-        
-        values = []
-        for ticket in batch:
-            escaped_text = ticket['ticket_text'].replace("'", "''")
-            resolution_time = ticket['resolution_time_hours'] if ticket['resolution_time_hours'] else 'NULL'
-            satisfaction = ticket['satisfaction_score'] if ticket['satisfaction_score'] else 'NULL'
-            
-            values.append(
-                f"('{ticket['ticket_id']}', '{ticket['customer_id']}', '{ticket['created_date']}', "
-                f"'{ticket['category']}', '{ticket['priority']}', '{ticket['status']}', "
-                f"{resolution_time}, {satisfaction}, '{escaped_text}')"
-            )
-        
-        insert_sql = f"""
-        INSERT INTO SUPPORT_TICKETS (ticket_id, customer_id, created_date, category, priority, status, 
-                                   resolution_time_hours, satisfaction_score, ticket_text)
-        VALUES {', '.join(values)}
-        """
-        
-        session.sql(insert_sql).collect()
-    
+    """Bulk load support tickets."""
+    load_dataframe(session, tickets_data, "SUPPORT_TICKETS")
     print(f"✅ Inserted {len(tickets_data)} support tickets")
 
 def insert_churn_events_data(session, churn_data):
     """Insert churn events and update customer status."""
-    
-    # Insert churn events
-    batch_size = 500
-    
-    for i in range(0, len(churn_data), batch_size):
-        batch = churn_data[i:i + batch_size]
-        
-        values = []
-        for churn in batch:
-            values.append(
-                f"('{churn['churn_id']}', '{churn['customer_id']}', '{churn['churn_date']}', "
-                f"'{churn['churn_reason']}', {churn['days_since_signup']}, "
-                f"'{churn['final_plan_type']}', {churn['final_monthly_revenue']})"
-            )
-        
-        insert_sql = f"""
-        INSERT INTO CHURN_EVENTS (churn_id, customer_id, churn_date, churn_reason, 
-                                days_since_signup, final_plan_type, final_monthly_revenue)
-        VALUES {', '.join(values)}
-        """
-        
-        session.sql(insert_sql).collect()
-    
-    # Update customer status to 'churned'
-    churned_customer_ids = [f"'{churn['customer_id']}'" for churn in churn_data]
-    
-    update_sql = f"""
-    UPDATE CUSTOMERS 
-    SET status = 'churned' 
-    WHERE customer_id IN ({', '.join(churned_customer_ids)})
-    """
-    
-    session.sql(update_sql).collect()
+    load_dataframe(session, churn_data, "CHURN_EVENTS")
+    
+    # Update customer status to 'churned' (hash join against the loaded events)
+    session.sql("""
+    MERGE INTO CUSTOMERS c
+    USING (SELECT DISTINCT customer_id FROM CHURN_EVENTS) e
+    ON c.customer_id = e.customer_id
+    WHEN MATCHED THEN UPDATE SET status = 'churned'
+    """).collect()
     print(f"✅ Inserted {len(churn_data)} churn events and updated customer status")
 
 def validate_data(session):
@@ -602,11 +555,14 @@ def validate_data(session):
     print("🔍 DATA VALIDATION SUMMARY")
     print("=" * 50)
     
-    # Table counts
+    # Table counts (one round-trip for all tables)
     tables = ['CUSTOMERS', 'USAGE_EVENTS', 'SUPPORT_TICKETS', 'CHURN_EVENTS']
+    counts_sql = " UNION ALL ".join(
+        f"SELECT '{table}' as table_name, COUNT(*) as count FROM {table}" for table in tables
+    )
+    counts = {row['TABLE_NAME']: row['COUNT'] for row in session.sql(counts_sql).collect()}
     for table in tables:
-        count = session.sql(f"SELECT COUNT(*) as count FROM {table}").collect()[0]['COUNT']
-        print(f"📊 {table}: {count:,} records")
+        print(f"📊 {table}: {counts[table]:,} records")
     
     # Churn rate analysis
     churn_analysis = session.sql("""
@@ -628,10 +584,10 @@ def validate_data(session):
             DATE_TRUNC('month', churn_date) as month,
             COUNT(*) as churn_count
         FROM CHURN_EVENTS 
-        WHERE churn_date >= '2024-01-01'
+        WHERE churn_date >= ?
         GROUP BY DATE_TRUNC('month', churn_date)
         ORDER BY month
-    """).collect()
+    """, params=['2024-01-01']).collect()
     
     print(f"\n🚨 Monthly Churn Trend (2024):")
     for row in monthly_churn:
@@ -642,11 +598,11 @@ def validate_data(session):
     recent_churn_reasons = session.sql("""
         SELECT churn_reason, COUNT(*) as count
         FROM CHURN_EVENTS 
-        WHERE churn_date >= '2024-07-01'
+        WHERE churn_date >= ?
         GROUP BY churn_reason 
         ORDER BY count DESC
         LIMIT 5
-    """).collect()
+    """, params=[str(RECENT_CUTOFF)]).collect()
     
     print(f"\n🎯 Recent Churn Reasons (July-Oct 2024):")
     for row in recent_churn_reasons:
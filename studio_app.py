@@ -5,27 +5,54 @@ A hub-and-spoke architecture where a supervisor coordinates specialized
 Snowflake Cortex Agents for customer intelligence analysis.
 
 Architecture:
-    START → supervisor (planning) → Agent → supervisor (routing) → ... → supervisor (synthesis) → END
+    START → supervisor (planning) → Agent wave → supervisor (routing) → ... → final Agent wave → joiner (synthesis) → END
 
 Efficiency Features:
-- Immutable plan: Created once, executed linearly
+- Immutable plan: Created once, executed in dependency waves
+- Exact plan cache: Repeated queries reuse their last successful plan with no LLM call
+- Semantic plan cache: Similar queries adapt a cached plan template with a small model
+  (a miss adds one EMBED_TEXT_768 call before planning; templates are stored only after a clean run)
+- Keyword routing: Unambiguous single-agent queries get a one-step plan with no LLM call
+- Tiered planning: A cheap classifier sends simple queries to the small planner, complex ones to sonnet
+- Agent result cache: Identical agent steps that succeeded are answered from memory for an hour
+- Parallel steps: Steps without pending dependencies run concurrently, even on the same agent
+- Wide-and-shallow graph: The final wave fans in to the joiner, skipping a supervisor round-trip
+- Synthesis bypass: A single short agent answer is returned directly (DISABLE_SYNTHESIS_BYPASS to turn off)
 - No LLM routing calls: Supervisor uses simple plan lookup  
 - Consolidated queries: Single SQL aggregations
 - Aggregated error handling: Errors collected, not cascaded
 """
 
+import asyncio
+import copy
+import hashlib
+import io
 import json
+import logging
+import math
 import os
-from typing import Dict, List, Optional, Literal
-from functools import partial
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, Dict, List, Optional, Literal, TypedDict
+from functools import lru_cache, partial
+
+import orjson
+import tiktoken
 
 # LangGraph imports
 from langgraph.graph import StateGraph, START, END
-from langgraph.types import Command
-from langgraph.graph.message import MessagesState
+from langgraph.types import Command, Send
+from langgraph.graph.message import MessagesState, add_messages
+from langgraph.config import get_stream_writer
 
 # LangChain imports
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langchain_core.messages import HumanMessage, AIMessage, AnyMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 
 # Fix for langchain_snowflake import compatibility
@@ -40,43 +67,127 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Progress output goes through a logger; STUDIO_LOG=DEBUG adds per-agent detail, WARNING silences it
+logger = logging.getLogger("studio_app")
+_log_level = (os.getenv("STUDIO_LOG") or "INFO").strip().upper()
+# getLevelName maps a known level name to its number (works before 3.11's getLevelNamesMapping)
+logger.setLevel(_log_level if isinstance(logging.getLevelName(_log_level), int) else logging.INFO)
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+if logger.level == logging.INFO and _log_level != "INFO":
+    logger.warning("⚠️ Unknown STUDIO_LOG=%r, using INFO", os.getenv("STUDIO_LOG"))
+
 
 # =============================================================================
 # STATE DEFINITION
 # =============================================================================
 
+# Nodes only ever need the latest turn, so older history is dropped to keep state and checkpoints small
+MAX_MESSAGE_HISTORY = 20
+
+
+def add_and_trim_messages(existing: List[AnyMessage], new) -> List[AnyMessage]:
+    """Reducer for messages: add_messages semantics, then keep only the last MAX_MESSAGE_HISTORY."""
+    return add_messages(existing, new)[-MAX_MESSAGE_HISTORY:]
+
+
+def merge_agent_outputs(existing: Dict[str, str], new: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Reducer for agent outputs: parallel branches merge in their delta, None resets for a new plan."""
+    if new is None:
+        return {}
+    return {**existing, **new}
+
+
+def add_execution_errors(existing: List[str], new: Optional[List[str]]) -> List[str]:
+    """Reducer for execution errors: branches append, None resets for a new plan."""
+    if new is None:
+        return []
+    return existing + new
+
+
 class State(MessagesState):
     """Extended state for efficient execution tracking.
     
     - Plan is created ONCE and never modified
-    - Agent outputs stored in dedicated field (avoids message parsing)
+    - Steps are grouped into dependency levels, each level runs as one parallel wave
+    - Agent outputs stored in dedicated field keyed per step (avoids message parsing)
     - Errors are aggregated, not cascaded
+    - Nodes return only their delta; reducers merge outputs and errors from parallel branches
+    - Message history is capped at MAX_MESSAGE_HISTORY, so long sessions don't grow state without bound
     """
+    messages: Annotated[List[AnyMessage], add_and_trim_messages]
     plan: Optional[Dict] = None
-    current_step: int = 0
-    agent_outputs: Dict = {}
-    execution_errors: List = []
+    original_query: str = ""
+    levels: List[List[int]] = []
+    current_level: int = 0
+    agent_outputs: Annotated[Dict[str, str], merge_agent_outputs] = {}
+    execution_errors: Annotated[List[str], add_execution_errors] = []
     planning_complete: bool = False
+    cache_bypass: bool = False
+
+
+class AgentTask(TypedDict):
+    """Payload sent to an agent node for a single plan step."""
+    step: Dict
+    query: str
+    cache_bypass: bool
+    return_to: str
 
 
 # =============================================================================
 # SNOWFLAKE SESSION & AGENTS
 # =============================================================================
 
-# Create Snowflake session
-session = create_session_from_env()
+# Guards the first-use builders below: async nodes call them through asyncio.to_thread,
+# so two worker threads must not both log in or both load the same cache file
+_BUILD_LOCK = threading.RLock()
+
 
-# Set warehouse
-warehouse = os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH')
-session.sql(f"USE WAREHOUSE {warehouse}").collect()
+def build_once(fn):
+    """lru_cache a zero-argument builder, building it at most once even across threads."""
+    cached = lru_cache(maxsize=1)(fn)
+    
+    def wrapper():
+        with _BUILD_LOCK:
+            return cached()
+    wrapper.__doc__ = fn.__doc__
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+@build_once
+def get_session():
+    """Create the shared Snowflake session once, with a single setup round-trip at most.
+    
+    This is a blocking login: async code must reach it via asyncio.to_thread.
+    """
+    session = create_session_from_env()
+    
+    # create_session_from_env already connects with SNOWFLAKE_WAREHOUSE; only fall back when unset
+    if not os.getenv('SNOWFLAKE_WAREHOUSE'):
+        session.sql("USE WAREHOUSE COMPUTE_WH").collect()
+    return session
 
-# Supervisor model for routing and synthesis
-supervisor_model = ChatSnowflake(
-    session=session,
-    model="claude-4-sonnet",
-    temperature=0.1,
-    max_tokens=2000
-)
+
+MODEL_CONFIGS = {
+    # Supervisor model for planning: deterministic, and plan JSON rarely needs more than ~600 tokens
+    "supervisor": {"model": "claude-4-sonnet", "temperature": 0.0, "max_tokens": 900},
+    # Synthesis model: longer budget for the final write-up
+    "synthesis": {"model": "claude-4-sonnet", "temperature": 0.1, "max_tokens": 1500},
+    # Small model that plans simple queries and adapts cached plan templates
+    "small_planner": {"model": "claude-3-5-haiku", "temperature": 0, "max_tokens": 800},
+    # Cheap classifier that decides whether a query needs the full planner; the answer is one word
+    "classifier": {"model": "claude-3-5-haiku", "temperature": 0, "max_tokens": 5},
+}
+
+
+@lru_cache(maxsize=None)
+def get_model(role: str) -> ChatSnowflake:
+    """Build a MODEL_CONFIGS chat model on first use, so importing the graph never connects."""
+    return ChatSnowflake(session=get_session(), **MODEL_CONFIGS[role])
 
 # Agent configuration
 AGENT_DATABASE = "SNOWFLAKE_INTELLIGENCE"
@@ -84,30 +195,80 @@ AGENT_SCHEMA = "AGENTS"
 AGENT_WAREHOUSE = os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH')
 AGENT_NAMES = ["CONTENT_AGENT", "DATA_ANALYST_AGENT", "RESEARCH_AGENT"]
 
-# Initialize specialized agents
-content_agent = SnowflakeCortexAgent(
-    session=session,
-    name="CONTENT_AGENT",
-    database=AGENT_DATABASE,
-    schema=AGENT_SCHEMA,
-    warehouse=AGENT_WAREHOUSE,
-)
-
-data_analyst_agent = SnowflakeCortexAgent(
-    session=session,
-    name="DATA_ANALYST_AGENT",
-    database=AGENT_DATABASE,
-    schema=AGENT_SCHEMA,
-    warehouse=AGENT_WAREHOUSE,
-)
-
-research_agent = SnowflakeCortexAgent(
-    session=session,
-    name="RESEARCH_AGENT",
-    database=AGENT_DATABASE,
-    schema=AGENT_SCHEMA,
-    warehouse=AGENT_WAREHOUSE,
-)
+# Agent answers are truncated once, when received, to this many tokens
+MAX_AGENT_OUTPUT_TOKENS = 1500
+
+# A single clean agent answer shorter than this is returned as-is, without a synthesis call
+SYNTHESIS_BYPASS_MAX_CHARS = 3000
+SYNTHESIS_BYPASS_ENABLED = not os.getenv("DISABLE_SYNTHESIS_BYPASS")
+
+@lru_cache(maxsize=None)
+def get_agent(name: str) -> SnowflakeCortexAgent:
+    """Build a specialized Cortex Agent on first use; agents a plan never calls are never created."""
+    return SnowflakeCortexAgent(
+        session=get_session(),
+        name=name,
+        database=AGENT_DATABASE,
+        schema=AGENT_SCHEMA,
+        warehouse=AGENT_WAREHOUSE,
+    )
+
+
+# Client-side throttle for Cortex Agent calls: waiting here is cheaper than a 429 and backoff
+CORTEX_MAX_CONCURRENCY = int(os.getenv("CORTEX_MAX_CONCURRENCY", "4"))
+CORTEX_MAX_RPM = int(os.getenv("CORTEX_MAX_RPM", "0"))  # 0 disables the per-minute limit
+
+
+class RequestRateLimiter:
+    """Token bucket allowing `rate` requests per `period` seconds, refilled continuously.
+    
+    Each caller reserves its token under a short thread lock (not bound to any event loop)
+    and then sleeps until its reservation is due, so one waiter never blocks the others.
+    """
+    
+    def __init__(self, rate: int, period: float = 60.0):
+        self.rate = rate
+        self.period = period
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    async def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.period)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens * self.period / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            await asyncio.sleep(wait)
+
+
+# asyncio primitives bind to the loop they are first used on, so each running loop
+# (Studio's server loop, every asyncio.run in scripts) gets its own semaphore
+_CORTEX_SEMAPHORES = weakref.WeakKeyDictionary()
+_CORTEX_SEMAPHORES_LOCK = threading.Lock()
+CORTEX_RATE_LIMITER = RequestRateLimiter(CORTEX_MAX_RPM) if CORTEX_MAX_RPM > 0 else None
+
+
+def get_cortex_semaphore() -> asyncio.Semaphore:
+    """The CORTEX_MAX_CONCURRENCY semaphore for the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    with _CORTEX_SEMAPHORES_LOCK:
+        semaphore = _CORTEX_SEMAPHORES.get(loop)
+        if semaphore is None:
+            semaphore = _CORTEX_SEMAPHORES[loop] = asyncio.Semaphore(CORTEX_MAX_CONCURRENCY)
+    return semaphore
+
+
+@asynccontextmanager
+async def cortex_slot():
+    """Hold one of CORTEX_MAX_CONCURRENCY agent slots for a whole call, after any RPM wait."""
+    # Wait for the RPM budget first, so callers sleeping on it don't sit on concurrency slots
+    if CORTEX_RATE_LIMITER is not None:
+        await CORTEX_RATE_LIMITER.acquire()
+    async with get_cortex_semaphore():
+        yield
 
 
 # =============================================================================
@@ -142,6 +303,7 @@ You are an Executive AI Assistant supervisor. Create DETAILED, ACTIONABLE execut
 - Need to ANALYZE specific customers' sentiment → CONTENT_AGENT (UDF)
 - Need aggregate BEHAVIOR metrics (usage, sessions, engagement) → DATA_ANALYST_AGENT
 - Need STRATEGIC analysis (CLV, market share, industry trends) → RESEARCH_AGENT
+- Query touches several facets → one step per facet; steps with empty uses_data_from run IN PARALLEL
 
 **JSON Response Format:**
 {{
@@ -164,18 +326,12 @@ You are an Executive AI Assistant supervisor. Create DETAILED, ACTIONABLE execut
     "expected_final_output": "Final deliverable specification"
 }}
 
-**Query:** {input}
-
 **RESPOND WITH ONLY THE JSON - Plan will be executed exactly as specified.**
 """
 
 synthesis_prompt = """
 You are an Executive AI Assistant synthesizing agent results into a clear answer.
-
-**Original Question**: {question}
-**Plan Summary**: {plan_summary}
-**Agent Results**:
-{agent_outputs}
+The user turn carries the original question, the plan summary and the agent results.
 
 **Your Task**: Provide a clear, confident answer using the data returned.
 
@@ -196,6 +352,36 @@ You are an Executive AI Assistant synthesizing agent results into a clear answer
 [2-3 actionable next steps based on findings]
 """
 
+plan_adaptation_prompt = """
+You are an Executive AI Assistant supervisor adapting a cached execution plan to a new query.
+The template was created for a similar query and already uses the right agents, tools and step order.
+
+**Adaptation Rules:**
+1. Keep every step's step_number, agent, tool, data_source, uses_data_from and next_agent unchanged.
+2. Fill in purpose, consolidated_query and expected_output for each step to answer the query.
+3. Write plan_summary, combination_strategy and expected_final_output for the query.
+
+**RESPOND WITH ONLY THE JSON - same format as the template plus the filled-in fields.**
+"""
+
+complexity_prompt = """
+You classify customer intelligence queries before planning.
+
+- simple: ONE agent can answer it in a single step (ticket search/sentiment, usage/churn metrics, OR market/CLV analysis)
+- complex: needs several agents, combines data sources, or has steps that depend on each other
+
+Output JUST 'simple' or 'complex'.
+"""
+
+# System prompts above are fully static (no per-request variables) so every call shares
+# an identical prefix the model endpoint can cache; request data goes in the human turn
+synthesis_request = """**Original Question**: {question}
+**Plan Summary**: {plan_summary}
+**Agent Results**:
+{agent_outputs}
+
+Synthesize the agent results into a clear answer to the original question."""
+
 planning_prompt_template = ChatPromptTemplate.from_messages([
     ("system", planning_prompt),
     ("human", "{input}")
@@ -203,156 +389,648 @@ planning_prompt_template = ChatPromptTemplate.from_messages([
 
 synthesis_prompt_template = ChatPromptTemplate.from_messages([
     ("system", synthesis_prompt),
-    ("human", "Synthesize the agent results into a clear answer to the original question.")
+    ("human", synthesis_request)
+])
+
+plan_adaptation_prompt_template = ChatPromptTemplate.from_messages([
+    ("system", plan_adaptation_prompt),
+    ("human", "**Plan Template:**\n{template}\n\n**Query:** {input}")
+])
+
+complexity_prompt_template = ChatPromptTemplate.from_messages([
+    ("system", complexity_prompt),
+    ("human", "{input}")
 ])
 
+# Chain name -> (prompt, MODEL_CONFIGS role)
+CHAIN_SPECS = {
+    "planning": (planning_prompt_template, "supervisor"),
+    "synthesis": (synthesis_prompt_template, "synthesis"),
+    "small_planning": (planning_prompt_template, "small_planner"),
+    "plan_adaptation": (plan_adaptation_prompt_template, "small_planner"),
+    "complexity": (complexity_prompt_template, "classifier"),
+}
+
+
+@lru_cache(maxsize=None)
+def get_chain(name: str):
+    """Compose a CHAIN_SPECS chain once, on first use, instead of rebuilding it on every call."""
+    prompt, role = CHAIN_SPECS[name]
+    return prompt | get_model(role)
+
+
+# =============================================================================
+# PLAN & AGENT RESULT CACHES
+# =============================================================================
+
+PLAN_CACHE_PATH = os.path.expanduser(os.getenv("PLAN_CACHE_PATH", "~/.sfagent_plan_cache.db"))
+PLAN_CACHE_THRESHOLD = 0.90
+PLAN_FP_CACHE_PATH = os.path.expanduser(os.getenv("PLAN_FP_CACHE_PATH", "~/.sfagent_plan_fp_cache.json"))
+EMBEDDING_MODEL = "snowflake-arctic-embed-m-v1.5"
+AGENT_CACHE_TTL = 3600
+
+# Plan fields that hold query-specific entities and values; the adapter fills them back in
+PLAN_ENTITY_FIELDS = {"plan_summary", "combination_strategy", "expected_final_output"}
+STEP_ENTITY_FIELDS = {"purpose", "consolidated_query", "expected_output"}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ttl seconds after being set."""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = OrderedDict()  # key -> (expires_at, value)
+    
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.time():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return entry[1]
+    
+    def set(self, key, value, expires_at: Optional[float] = None):
+        with self.lock:
+            self.data[key] = (expires_at or time.time() + self.ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+    
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.data.pop(key, None)
+        if entry is None or entry[0] < time.time():
+            return default
+        return entry[1]
+    
+    def snapshot(self) -> Dict[Any, tuple]:
+        """Unexpired entries as {key: (expires_at, value)}, oldest first."""
+        now = time.time()
+        with self.lock:
+            return {key: entry for key, entry in self.data.items() if entry[0] >= now}
+
+
+def _plan_fp(query: str) -> str:
+    """Fingerprint a query for exact-match plan lookup."""
+    return hashlib.sha256(" ".join(query.lower().split()).encode()).hexdigest()
+
+
+def load_plan_fp_cache(path: str = PLAN_FP_CACHE_PATH) -> TTLCache:
+    """Load the exact-match plan cache persisted by save_plan_fp_cache."""
+    cache = TTLCache(maxsize=512, ttl=86400)
+    try:
+        with open(path) as f:
+            for fp, (expires_at, plan) in json.load(f).items():
+                if isinstance(plan, dict) and isinstance(expires_at, (int, float)):
+                    cache.set(fp, plan, expires_at)
+    except (OSError, ValueError, TypeError, AttributeError):
+        # Missing, corrupt or foreign-shaped file: start empty rather than fail every request
+        pass
+    return cache
+
+
+# Joiners of concurrent runs save from worker threads; one writer at a time
+_PLAN_FP_SAVE_LOCK = threading.Lock()
+
+
+def save_plan_fp_cache(path: str = PLAN_FP_CACHE_PATH):
+    """Persist the exact-match plan cache atomically (unique temp file, then os.replace)."""
+    with _PLAN_FP_SAVE_LOCK:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(get_plan_fp_cache().snapshot(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def make_plan_template(plan: Dict) -> Dict:
+    """Strip query-specific fields from a plan, keeping its agent/tool/dependency structure."""
+    template = {
+        key: value for key, value in plan.items()
+        if key not in PLAN_ENTITY_FIELDS and not key.startswith("_")
+    }
+    template["steps"] = [
+        {key: value for key, value in step.items() if key not in STEP_ENTITY_FIELDS}
+        for step in plan.get("steps", [])
+    ]
+    return template
+
+
+class PlanCache:
+    """Semantic plan-template cache: Cortex query embeddings + SQLite, cosine top-1 lookup.
+    
+    - Embeddings are normalized on write, so similarity is a dot product
+    - All templates are held in memory; SQLite only persists them across restarts
+    - Templates are stored by the joiner, only after the plan ran without errors
+    - A miss costs one extra EMBED_TEXT_768 round-trip before planning starts
+    """
+    
+    def __init__(self, session, path: str = PLAN_CACHE_PATH, threshold: float = PLAN_CACHE_THRESHOLD):
+        self.session = session
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS plan_templates (
+                query TEXT PRIMARY KEY,
+                embedding TEXT NOT NULL,
+                template TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.entries = {
+            query: (json.loads(embedding), json.loads(template))
+            for query, embedding, template in self.conn.execute("SELECT query, embedding, template FROM plan_templates")
+        }
+    
+    def embed(self, text: str) -> List[float]:
+        """Embed text with Cortex and return the unit-length vector."""
+        row = self.session.sql(
+            f"SELECT SNOWFLAKE.CORTEX.EMBED_TEXT_768('{EMBEDDING_MODEL}', ?)", params=[text]
+        ).collect()[0]
+        vector = [float(x) for x in row[0]]
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+    
+    def lookup(self, embedding: List[float]) -> Optional[Dict]:
+        """Return the most similar cached template at or above the threshold."""
+        best_template, best_score = None, self.threshold
+        # Snapshot under the lock: store() may add entries from another worker thread meanwhile
+        with self.lock:
+            entries = list(self.entries.values())
+        for cached_embedding, template in entries:
+            score = sum(a * b for a, b in zip(embedding, cached_embedding))
+            if score >= best_score:
+                best_template, best_score = template, score
+        return best_template
+    
+    def store(self, query: str, embedding: List[float], plan: Dict):
+        """Templatize a freshly generated plan and persist it."""
+        template = make_plan_template(plan)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO plan_templates (query, embedding, template) VALUES (?, ?, ?)",
+                (query, json.dumps(embedding), json.dumps(template))
+            )
+            self.conn.commit()
+            self.entries[query] = (embedding, template)
+    
+    def match(self, text: str) -> tuple[List[float], Optional[Dict]]:
+        """Embed text and look up its closest template in one blocking call (run via to_thread)."""
+        embedding = self.embed(text)
+        return embedding, self.lookup(embedding)
+
+
+def agent_cache_key(agent_name: str, task: AgentTask) -> Optional[tuple]:
+    """Key an agent answer by agent, step and the exact (context-enhanced) query sent to it.
+    
+    None means "don't cache": cache_bypass is set, or the input is not an AgentTask.
+    """
+    step = task.get("step") if isinstance(task, dict) else None
+    if not step or task.get("cache_bypass"):
+        return None
+    key = f"{step_output_key(step)}\0{task.get('return_to', '')}\0{task.get('query', '')}"
+    return (agent_name, hashlib.sha256(key.encode()).hexdigest())
+
+
+@build_once
+def get_plan_cache() -> PlanCache:
+    """Open the semantic plan cache (SQLite load + Snowflake session) on first use; blocking."""
+    return PlanCache(get_session())
+
+
+@build_once
+def get_plan_fp_cache() -> TTLCache:
+    """Load the persisted exact-match plan cache on first use; blocking."""
+    return load_plan_fp_cache()
+
+
+def remember_plan(query: str, plan: Dict, query_embedding: Optional[List[float]] = None):
+    """Record a cleanly executed plan in the exact-match cache, and as a semantic template
+    when the supervisor embedded the query. Blocking (file + SQLite writes): run via to_thread."""
+    get_plan_fp_cache().set(_plan_fp(query), strip_private_keys(plan))
+    save_plan_fp_cache()
+    if query_embedding is not None:
+        get_plan_cache().store(query, query_embedding, plan)
+
+
+# Only error-free answers are stored, so a transient agent failure is retried on the next run
+AGENT_RESULT_CACHE = TTLCache(maxsize=1024, ttl=AGENT_CACHE_TTL)
+# Query fingerprint -> embedding of a freshly planned query, kept out of graph state until
+# the joiner knows whether the plan ran cleanly enough to become a semantic-cache template
+PENDING_PLAN_EMBEDDINGS = TTLCache(maxsize=256, ttl=AGENT_CACHE_TTL)
+
 
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
+# Message type -> "human" / "dict" / "other"; exact-type lookup, MRO checked once per new type
+_MESSAGE_KINDS = {HumanMessage: "human", dict: "dict"}
+
+
+def _message_kind(msg) -> str:
+    """Classify a message via _MESSAGE_KINDS, caching subclasses on first sight."""
+    msg_type = type(msg)
+    kind = _MESSAGE_KINDS.get(msg_type)
+    if kind is None:
+        if issubclass(msg_type, HumanMessage):
+            kind = "human"
+        elif issubclass(msg_type, dict):
+            kind = "dict"
+        else:
+            kind = "other"
+        _MESSAGE_KINDS[msg_type] = kind
+    return kind
+
+
+def _content_text(content) -> str:
+    """Text of a message content: plain string, or the first text part of a content list."""
+    if type(content) is str:
+        return content
+    if type(content) is list:
+        for item in content:
+            if type(item) is str:
+                return item
+            if isinstance(item, dict) and item.get("type") == "text":
+                return item.get("text", "")
+    return str(content)
+
+
 def get_latest_human_message(messages: List[BaseMessage]) -> str:
     """Extract the latest human message content from the message list."""
-    if not messages:
-        return ""
-    for msg in reversed(messages):
-        if isinstance(msg, HumanMessage):
-            content = msg.content
-            if isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "text":
-                        return item.get("text", "")
-                    elif isinstance(item, str):
-                        return item
-            return str(content)
-        if isinstance(msg, dict):
-            if msg.get("type") == "human" or msg.get("role") == "user":
-                content = msg.get("content", "")
-                if isinstance(content, list):
-                    for item in content:
-                        if isinstance(item, dict) and item.get("type") == "text":
-                            return item.get("text", "")
-                return str(content)
+    for msg in reversed(messages or ()):
+        kind = _message_kind(msg)
+        if kind == "human":
+            return _content_text(msg.content)
+        if kind == "dict" and (msg.get("type") == "human" or msg.get("role") == "user"):
+            return _content_text(msg.get("content", ""))
     return ""
 
 
+# Models usually wrap the plan in a ```json fence: grab its body in one regex pass for orjson
+PLAN_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Stdlib decoder for its raw_decode: stops at the end of the first object, ignoring trailing prose
+PLAN_JSON_DECODER = json.JSONDecoder()
+
+
+def parse_plan_json(content: str) -> Dict:
+    """Extract the first JSON object from an LLM response."""
+    match = PLAN_FENCE_RE.search(content)
+    if match:
+        try:
+            plan = orjson.loads(match.group(1))
+            if isinstance(plan, dict):
+                return plan
+        except orjson.JSONDecodeError:
+            pass
+    
+    # No clean fence: scan for the first brace that starts a valid object
+    start = content.find("{")
+    while start >= 0:
+        try:
+            plan, _ = PLAN_JSON_DECODER.raw_decode(content, start)
+            if isinstance(plan, dict):
+                return plan
+        except json.JSONDecodeError:
+            pass
+        # A brace in prose, not the plan: try the next one
+        start = content.find("{", start + 1)
+    raise ValueError("No valid JSON found")
+
+
+def index_plan_steps(plan: Dict) -> Dict:
+    """Add the private _steps_by_num index (step_number -> step) used for dependency lookups.
+    
+    Steps whose step_number is missing, not an integer or already taken are renumbered
+    (lowest free number, in list order), so no planned step is lost to a key collision.
+    """
+    steps = plan.get("steps", [])
+    taken = set()
+    unnumbered = []
+    for step in steps:
+        step_num = step.get("step_number")
+        if isinstance(step_num, int) and not isinstance(step_num, bool) and step_num not in taken:
+            taken.add(step_num)
+        else:
+            unnumbered.append(step)
+    
+    next_num = 1
+    for step in unnumbered:
+        while next_num in taken:
+            next_num += 1
+        step["step_number"] = next_num
+        taken.add(next_num)
+    
+    plan["_steps_by_num"] = {step["step_number"]: step for step in steps}
+    return plan
+
+
+def strip_private_keys(plan: Dict) -> Dict:
+    """Drop derived keys such as _steps_by_num before a plan is cached."""
+    return {key: value for key, value in plan.items() if not key.startswith("_")}
+
+
+def get_original_query(state) -> str:
+    """Query captured at planning time; scans messages only if it was never stored."""
+    return state.get("original_query") or get_latest_human_message(state.get("messages", []))
+
+
+# Free first-pass routing, per the planner's agent selection guide; only unambiguous matches count
+KEYWORD_ROUTES = [
+    (re.compile(r"\b(sentiment|feedback|complain\w*|tickets?|support)\b", re.IGNORECASE), "CONTENT_AGENT"),
+    (re.compile(r"\b(usage|engagement|sessions?|churn\w*|behaviou?r\w*|adoption)\b", re.IGNORECASE), "DATA_ANALYST_AGENT"),
+    (re.compile(r"\b(market\w*|industr(?:y|ies)|clv|lifetime value|segments?|competit\w*|strateg\w*)\b", re.IGNORECASE), "RESEARCH_AGENT"),
+]
+
+
+def keyword_route(query: str) -> Optional[str]:
+    """The one agent whose keywords the query mentions, or None when zero or several match."""
+    matches = {agent for pattern, agent in KEYWORD_ROUTES if pattern.search(query)}
+    return matches.pop() if len(matches) == 1 else None
+
+
+def single_step_plan(agent: str, query: str, plan_summary: str, purpose: str) -> Dict:
+    """A one-step plan sending the query, unchanged, straight to one agent.
+    
+    These plans (keyword routes, the planning-error fallback) cost nothing to rebuild and must
+    not shadow a real plan, so they are flagged _cacheable=False and never enter the plan caches.
+    """
+    return {
+        "plan_summary": plan_summary,
+        "total_steps": 1,
+        "steps": [{"step_number": 1, "agent": agent, "purpose": purpose,
+                   "consolidated_query": query, "uses_data_from": [], "next_agent": None}],
+        "_cacheable": False,
+    }
+
+
+QueryComplexity = Literal["simple", "complex"]
+
+
+async def classify_query(query: str) -> QueryComplexity:
+    """Classify a query as 'simple' or 'complex' with the cheap model; failures count as complex."""
+    try:
+        # First use builds the model, which may log in to Snowflake: keep that off the event loop
+        chain = await asyncio.to_thread(get_chain, "complexity")
+        response = await chain.ainvoke({"input": query})
+        content = response.content if hasattr(response, 'content') else str(response)
+        return "simple" if content.strip().strip("'\"").lower().startswith("simple") else "complex"
+    except Exception as e:
+        logger.warning("⚠️ Query classification failed: %s", e)
+        return "complex"
+
+
 def has_plan(state) -> bool:
     """Check if an execution plan has been created."""
     return state.get("plan") is not None and state.get("planning_complete", False)
 
 
-def get_current_step(state):
-    """Get the current step from the execution plan."""
-    plan = state.get("plan")
-    current_step_idx = state.get("current_step", 0)
-    if plan and "steps" in plan:
-        steps = plan["steps"]
-        if current_step_idx < len(steps):
-            return steps[current_step_idx]
-    return None
+def get_plan_levels(steps: List[Dict]) -> List[List[int]]:
+    """Topologically sort plan steps by uses_data_from into levels of independent step numbers."""
+    pending = {}
+    for step in steps:
+        pending[step.get("step_number")] = set(step.get("uses_data_from") or [])
+    for step_num, deps in pending.items():
+        deps.intersection_update(pending)
+        deps.discard(step_num)
+    
+    levels = []
+    done = set()
+    while pending:
+        ready = [step_num for step_num, deps in pending.items() if deps <= done]
+        if not ready:
+            # Dependency cycle: run the earliest remaining step on its own
+            ready = [next(iter(pending))]
+        levels.append(ready)
+        done.update(ready)
+        for step_num in ready:
+            del pending[step_num]
+    return levels
 
 
 def is_plan_complete(state) -> bool:
-    """Check if all steps in the plan have been executed."""
-    plan = state.get("plan")
-    current_step_idx = state.get("current_step", 0)
-    if plan and "steps" in plan:
-        return current_step_idx >= len(plan["steps"])
-    return True
+    """Check if every level of the plan has been dispatched."""
+    return state.get("current_level", 0) >= len(state.get("levels", []))
+
+
+def step_output_key(step: Dict) -> str:
+    """Key of a step's answer in agent_outputs, so one agent can serve several parallel steps."""
+    return f"{step.get('agent')}#{step.get('step_number')}"
 
 
 def get_all_agent_outputs(state) -> Dict[str, str]:
-    """Get all agent outputs from state."""
+    """Get all agent outputs from state, keyed per step."""
     if state.get("agent_outputs"):
         return state.get("agent_outputs", {})
     
-    outputs = {}
+    by_agent = {}
     messages = state.get("messages", [])
     for msg in messages:
         if hasattr(msg, 'name') and msg.name in AGENT_NAMES:
             content = msg.content if hasattr(msg, 'content') else str(msg)
-            outputs[msg.name] = content
-    return outputs
+            by_agent[msg.name] = content
+    
+    steps = (state.get("plan") or {}).get("steps", [])
+    return {step_output_key(step): by_agent[step.get("agent")] for step in steps if step.get("agent") in by_agent}
 
 
-def get_context_for_step(state, step: Dict) -> str:
-    """Get context from previous agent output for the current step."""
+def get_context_for_step(plan: Dict, agent_outputs: Dict[str, str], step: Dict) -> str:
+    """Get context from previous agent output for the given step."""
     uses_data_from = step.get("uses_data_from", [])
     if not uses_data_from:
         return ""
     
-    agent_outputs = state.get("agent_outputs", {})
-    plan = state.get("plan", {})
-    steps = plan.get("steps", [])
+    steps_by_num = plan.get("_steps_by_num", {})
     
     context_parts = []
     for step_num in uses_data_from:
-        for s in steps:
-            if s.get("step_number") == step_num:
-                agent_name = s.get("agent")
-                if agent_name in agent_outputs:
-                    output = agent_outputs[agent_name]
-                    if len(output) > 2000:
-                        output = output[:2000] + "..."
-                    context_parts.append(f"From {agent_name}: {output}")
-                break
+        s = steps_by_num.get(step_num)
+        if s:
+            output = agent_outputs.get(step_output_key(s))
+            if output is not None:
+                context_parts.append(f"From {s.get('agent')} (Step {step_num}): {output}")
     
     return "\n".join(context_parts)
 
 
 def format_agent_outputs_for_synthesis(outputs: Dict[str, str], plan: Dict) -> str:
-    """Format agent outputs for synthesis."""
-    formatted = []
+    """Format agent outputs for synthesis, streaming every block into one buffer."""
+    total_steps = plan.get('total_steps', len(plan.get('steps', [])))
+    buf = io.StringIO()
     for step in plan.get("steps", []):
-        agent_name = step.get("agent")
-        if agent_name in outputs:
-            output = outputs[agent_name]
-            if len(output) > 5000:
-                output = output[:5000] + "\n... [truncated]"
-            
-            formatted.append(f"""
-**{agent_name}** (Step {step.get('step_number')}/{plan.get('total_steps', len(plan.get('steps', [])))})
-Purpose: {step.get('purpose', 'N/A')}
-
-Results:
-{output}
-""")
+        output = outputs.get(step_output_key(step))
+        if output is not None:
+            if buf.tell():
+                buf.write("\n")
+            buf.write(f"\n**{step.get('agent')}** (Step {step.get('step_number')}/{total_steps})\n")
+            buf.write(f"Purpose: {step.get('purpose', 'N/A')}\n\nResults:\n")
+            buf.write(output)
+            buf.write("\n")
     
-    return "\n".join(formatted) if formatted else "No agent outputs available."
+    return buf.getvalue() or "No agent outputs available."
 
 
-def build_query_with_context(original_query: str, state: State) -> str:
-    """Build query with context from previous agent outputs."""
-    current_step = get_current_step(state)
-    if not current_step:
-        return original_query
+def build_query_with_context(original_query: str, plan: Dict, agent_outputs: Dict[str, str], step: Dict) -> str:
+    """Build a step's agent query: its own consolidated_query (or purpose), with the
+    original question and previous agent outputs as context.
     
-    context = get_context_for_step(state, current_step)
+    Parallel steps on the same agent therefore ask different things, not the same question twice.
+    """
+    task = (step.get("consolidated_query") or step.get("purpose") or "").strip()
+    query = original_query
+    if task and task != original_query:
+        query = f"{task}\n\nOriginal question: {original_query}"
+    context = get_context_for_step(plan, agent_outputs, step)
     if context:
-        return f"{original_query}\n\nContext from previous analysis:\n{context}"
-    return original_query
+        return f"{query}\n\nContext from previous analysis:\n{context}"
+    return query
 
 
-def parse_agent_stream_response(chunks: List[str]) -> tuple[str, List[str]]:
-    """Parse streaming response from Cortex Agent."""
-    response_parts = []
-    errors = []
+def dispatch_next_wave(plan: Dict, levels: List[List[int]], current_level: int, original_query: str,
+                       agent_outputs: Dict[str, str], cache_bypass: bool = False) -> tuple[int, List[Send]]:
+    """Build one Send per step of the next runnable level; returns the following level index.
+    
+    Branches of the last level report straight to the joiner, earlier ones back to the supervisor.
+    """
+    steps_by_num = plan["_steps_by_num"]
+    while current_level < len(levels):
+        wave = [steps_by_num[step_num] for step_num in levels[current_level]]
+        current_level += 1
+        sends = [
+            Send(step["agent"], {
+                "step": step,
+                "query": build_query_with_context(original_query, plan, agent_outputs, step),
+                "cache_bypass": cache_bypass,
+                "return_to": "joiner" if current_level == len(levels) else "supervisor"
+            })
+            for step in wave
+            if step.get("agent") in AGENT_NAMES
+        ]
+        if sends:
+            logger.debug("   → Routing wave %d/%d to %s", current_level, len(levels),
+                         ", ".join(send.node for send in sends))
+            return current_level, sends
+    return current_level, []
+
+
+@lru_cache(maxsize=1)
+def get_token_encoder() -> Optional[tiktoken.Encoding]:
+    """Load the cl100k_base encoder once; None if its BPE file can't be fetched (offline hosts)."""
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("⚠️ Token encoder unavailable, truncating by characters: %s", e)
+        return None
+
+
+async def truncate_agent_output(response_content: str) -> str:
+    """Cap an agent answer at MAX_AGENT_OUTPUT_TOKENS tokens before it enters state."""
+    # Every token spans at least one character, so short answers skip encoding entirely
+    if len(response_content) <= MAX_AGENT_OUTPUT_TOKENS:
+        return response_content
+    # Loading the encoder and BPE-encoding a long answer are blocking; keep them off the event loop
+    return await asyncio.to_thread(_truncate_to_tokens, response_content)
+
+
+def _truncate_to_tokens(response_content: str) -> str:
+    """Blocking half of truncate_agent_output: tokenize and cut (characters if no encoder)."""
+    encoder = get_token_encoder()
+    if encoder is None:
+        max_chars = MAX_AGENT_OUTPUT_TOKENS * 4
+        if len(response_content) <= max_chars:
+            return response_content
+        return response_content[:max_chars] + "\n... [truncated]"
     
-    for chunk in chunks:
+    tokens = encoder.encode(response_content, disallowed_special=())
+    if len(tokens) <= MAX_AGENT_OUTPUT_TOKENS:
+        return response_content
+    return encoder.decode(tokens[:MAX_AGENT_OUTPUT_TOKENS]) + "\n... [truncated]"
+
+
+def cached_agent_result(agent_name: str, task: AgentTask) -> Optional[Command]:
+    """Answer a step from AGENT_RESULT_CACHE when the agent recently answered it cleanly."""
+    key = agent_cache_key(agent_name, task)
+    response_content = AGENT_RESULT_CACHE.get(key) if key is not None else None
+    if response_content is None:
+        return None
+    
+    logger.info("   ⚡ cache hit (%s) tokens_saved≈%d", agent_name, len(response_content) // 4)
+    return Command(
+        update={
+            "messages": [AIMessage(content=response_content, name=agent_name)],
+            "agent_outputs": {step_output_key(task["step"]): response_content}
+        },
+        goto=task["return_to"]
+    )
+
+
+def store_agent_result(agent_name: str, task: AgentTask, response_content: str):
+    """Remember a clean agent answer for AGENT_CACHE_TTL seconds."""
+    key = agent_cache_key(agent_name, task)
+    if key is not None:
+        AGENT_RESULT_CACHE.set(key, response_content)
+
+
+def parse_chunk(chunk) -> tuple[Optional[str], Optional[str]]:
+    """Parse one streamed Cortex Agent chunk into (text, error); either may be None."""
+    # Branch once on type: dicts are used as-is, only raw str/bytes frames are JSON-decoded
+    if isinstance(chunk, dict):
+        chunk_data = chunk
+    elif isinstance(chunk, (str, bytes, bytearray)):
         try:
-            chunk_data = json.loads(chunk)
-            if isinstance(chunk_data, dict):
-                if chunk_data.get("type") == "text":
-                    response_parts.append(chunk_data.get("text", ""))
-                elif "content" in chunk_data:
-                    response_parts.append(str(chunk_data.get("content", "")))
-                elif "message" in chunk_data:
-                    errors.append(chunk_data.get("message", "Unknown error"))
-            else:
-                response_parts.append(str(chunk_data))
-        except (json.JSONDecodeError, TypeError):
-            if chunk and not chunk.startswith("{"):
-                response_parts.append(chunk)
+            chunk_data = orjson.loads(chunk)
+        except orjson.JSONDecodeError:
+            text = chunk if isinstance(chunk, str) else chunk.decode("utf-8", errors="replace")
+            # SnowflakeCortexAgent.astream reports failures as a plain "Error: ..." string
+            if text.startswith("Error:"):
+                return None, text[len("Error:"):].strip() or "Unknown error"
+            if text and not text.startswith("{"):
+                return text, None
+            return None, None
+    else:
+        return str(chunk), None
+    
+    if isinstance(chunk_data, dict):
+        if chunk_data.get("type") == "text":
+            return chunk_data.get("text", ""), None
+        if "content" in chunk_data:
+            return str(chunk_data.get("content", "")), None
+        if "message" in chunk_data:
+            return None, chunk_data.get("message", "Unknown error")
+        return None, None
+    return str(chunk_data), None
+
+
+async def parse_agent_stream(stream) -> tuple[str, set[str]]:
+    """Parse an async Cortex Agent stream chunk by chunk as it arrives.
+    
+    Errors are deduplicated as they are collected, so a stream repeating the
+    same error many times only ever holds one copy.
+    """
+    response_parts = []
+    errors: set[str] = set()
+    
+    async for chunk in stream:
+        text, error = parse_chunk(chunk)
+        if text:
+            response_parts.append(text)
+        if error:
+            errors.add(error)
     
     return "".join(response_parts), errors
 
@@ -361,13 +1039,15 @@ def parse_agent_stream_response(chunks: List[str]) -> tuple[str, List[str]]:
 # NODE FUNCTIONS
 # =============================================================================
 
-def supervisor_node(state: State) -> Command[Literal["CONTENT_AGENT", "DATA_ANALYST_AGENT", "RESEARCH_AGENT", "__end__"]]:
-    """Supervisor node: Planning → Routing → Synthesis"""
+async def supervisor_node(state: State) -> Command[Literal["CONTENT_AGENT", "DATA_ANALYST_AGENT", "RESEARCH_AGENT", "joiner", "__end__"]]:
+    """Supervisor node: Planning → Routing (synthesis happens in the joiner)"""
     messages = state.get("messages", [])
     plan = state.get("plan")
     
-    # MODE 1: PLANNING
-    if not has_plan(state):
+    # MODE 1: PLANNING (also when a new human turn arrives on a checkpointed thread,
+    # so the previous turn's plan, query and outputs are replaced rather than reused)
+    new_turn = bool(messages) and _message_kind(messages[-1]) == "human"
+    if new_turn or not has_plan(state):
         latest_message = get_latest_human_message(messages)
         
         if not latest_message:
@@ -380,255 +1060,349 @@ def supervisor_node(state: State) -> Command[Literal["CONTENT_AGENT", "DATA_ANAL
             )
         
         try:
-            planning_chain = planning_prompt_template | supervisor_model
-            response = planning_chain.invoke({"input": latest_message})
-            content = response.content if hasattr(response, 'content') else str(response)
+            query_embedding = None
+            template = None
+            
+            # Exact repeat of a query that already ran cleanly: reuse its plan as-is.
+            # Caches, models and the session are built on first use, in a worker thread
+            plan = None
+            try:
+                fp_cache = await asyncio.to_thread(get_plan_fp_cache)
+                plan = fp_cache.get(_plan_fp(latest_message))
+            except Exception as e:
+                logger.warning("⚠️ Exact plan cache skipped: %s", e)
+            if plan is not None:
+                plan = copy.deepcopy(plan)
+                logger.info("♻️ Plan cache hit - exact query match")
+            
+            # Clearly single-facet queries need no embedding, classifier or planner call at all
+            if plan is None:
+                agent = keyword_route(latest_message)
+                if agent:
+                    plan = single_step_plan(agent, latest_message, f"{agent} answers the query directly", "Answer the query")
+                    logger.info("🎯 Keyword match - routed straight to %s", agent)
+            
+            # Reuse a cached template for similar queries (small adapter model, no full replanning)
+            if plan is None:
+                try:
+                    plan_cache = await asyncio.to_thread(get_plan_cache)
+                    # Embedding round-trip and the O(N·768) similarity scan both stay off the event loop
+                    query_embedding, template = await asyncio.to_thread(plan_cache.match, latest_message)
+                    if template:
+                        chain = await asyncio.to_thread(get_chain, "plan_adaptation")
+                        response = await chain.ainvoke({"template": orjson.dumps(template).decode(), "input": latest_message})
+                        content = response.content if hasattr(response, 'content') else str(response)
+                        plan = parse_plan_json(content)
+                        logger.info("♻️ Plan cache hit - adapted cached template")
+                except Exception as e:
+                    logger.warning("⚠️ Plan cache skipped: %s", e)
             
-            if "{" in content and "}" in content:
-                start = content.find("{")
-                end = content.rfind("}") + 1
-                plan = json.loads(content[start:end])
-            else:
-                raise ValueError("No valid JSON found")
+            # Simple queries are planned by the small model; sonnet only plans complex ones
+            if plan is None and await classify_query(latest_message) == "simple":
+                try:
+                    chain = await asyncio.to_thread(get_chain, "small_planning")
+                    response = await chain.ainvoke({"input": latest_message})
+                    content = response.content if hasattr(response, 'content') else str(response)
+                    plan = parse_plan_json(content)
+                    logger.info("⚡ Simple query - planned with small model")
+                except Exception as e:
+                    logger.warning("⚠️ Small planner failed, using full planner: %s", e)
             
-            print(f"\n{'━'*60}")
-            print("📋 EXECUTION PLAN")
-            print(f"{'━'*60}")
-            print(f"\n{plan.get('plan_summary', 'N/A')}")
-            print(f"\n📍 Steps ({plan.get('total_steps', len(plan.get('steps', [])))}):")
-            for step in plan.get("steps", []):
-                print(f"   {step.get('step_number')}. {step.get('agent')}")
-            print(f"{'━'*60}\n")
+            if plan is None:
+                chain = await asyncio.to_thread(get_chain, "planning")
+                response = await chain.ainvoke({"input": latest_message})
+                content = response.content if hasattr(response, 'content') else str(response)
+                plan = parse_plan_json(content)
             
-            first_step = plan.get("steps", [{}])[0] if plan.get("steps") else {}
-            first_agent = first_step.get("agent", "CONTENT_AGENT")
+            # Freshly planned queries (no similar template yet) may seed the semantic cache once they succeed
+            if template is None and query_embedding is not None and plan.get("steps"):
+                PENDING_PLAN_EMBEDDINGS.set(_plan_fp(latest_message), query_embedding)
+            
+            if not plan.get("steps"):
+                raise ValueError("Plan has no steps")
+            index_plan_steps(plan)
+            levels = get_plan_levels(plan["steps"])
+            
+            if logger.isEnabledFor(logging.INFO):
+                rule = "━" * 60
+                steps_listing = "\n".join(
+                    f"   {step.get('step_number')}. {step.get('agent')}" for step in plan["steps"]
+                )
+                logger.info(
+                    "\n%s\n📋 EXECUTION PLAN\n%s\n\n%s\n\n📍 Steps (%s):\n%s\n\n⚡ Waves: %s\n%s\n",
+                    rule, rule, plan.get("plan_summary", "N/A"),
+                    plan.get("total_steps", len(plan["steps"])), steps_listing,
+                    " → ".join(str(level) for level in levels), rule
+                )
+            
+            current_level, sends = dispatch_next_wave(
+                plan, levels, 0, latest_message, {}, state.get("cache_bypass", False)
+            )
             
             return Command(
                 update={
                     "plan": plan,
-                    "current_step": 0,
+                    "original_query": latest_message,
+                    "levels": levels,
+                    "current_level": current_level,
                     "planning_complete": True,
-                    "agent_outputs": {},
-                    "execution_errors": []
+                    "agent_outputs": None,
+                    "execution_errors": None
                 },
-                goto=first_agent
+                goto=sends or "joiner"
             )
             
         except Exception as e:
-            print(f"⚠️ Planning error: {e}")
-            fallback_plan = {
-                "plan_summary": "Direct query routing",
-                "total_steps": 1,
-                "steps": [{"step_number": 1, "agent": "CONTENT_AGENT", "purpose": "Handle query", "next_agent": None}],
-            }
+            logger.warning("⚠️ Planning error: %s", e)
+            fallback_plan = single_step_plan("CONTENT_AGENT", latest_message, "Direct query routing", "Handle query")
+            index_plan_steps(fallback_plan)
+            levels = [[1]]
+            current_level, sends = dispatch_next_wave(
+                fallback_plan, levels, 0, latest_message, {}, state.get("cache_bypass", False)
+            )
             return Command(
                 update={
                     "plan": fallback_plan,
-                    "current_step": 0,
+                    "original_query": latest_message,
+                    "levels": levels,
+                    "current_level": current_level,
                     "planning_complete": True,
-                    "agent_outputs": {},
-                    "execution_errors": []
+                    "agent_outputs": None,
+                    "execution_errors": None
                 },
-                goto="CONTENT_AGENT"
+                goto=sends
             )
     
+    # Every branch of the previous wave has reported back
+    original_question = get_original_query(state)
+    agent_outputs = state.get("agent_outputs", {})
+    
     # MODE 2: ROUTING
     if not is_plan_complete(state):
-        current_step = get_current_step(state)
-        if current_step:
-            next_agent = current_step.get("agent")
-            if next_agent and next_agent in AGENT_NAMES:
-                print(f"   → Routing to {next_agent}")
-                return Command(goto=next_agent)
-    
-    # MODE 3: SYNTHESIS
-    original_question = get_latest_human_message(messages)
+        current_level, sends = dispatch_next_wave(
+            plan, state["levels"], state["current_level"], original_question, agent_outputs,
+            state.get("cache_bypass", False)
+        )
+        if sends:
+            return Command(update={"current_level": current_level}, goto=sends)
+    
+    # Nothing left to dispatch
+    return Command(goto="joiner")
+
+
+async def joiner_node(state: State) -> Command[Literal["__end__"]]:
+    """Joiner node: fan-in point after the final wave, synthesizes all agent results."""
+    plan = state.get("plan")
+    original_question = get_original_query(state)
     agent_outputs = get_all_agent_outputs(state)
     execution_errors = state.get("execution_errors", [])
     
-    print(f"📊 Synthesizing results from {len(agent_outputs)} agent(s)...")
+    # One short, non-empty, error-free answer: a second sonnet pass would only reformat it
+    single_output = next(iter(agent_outputs.values())) if len(agent_outputs) == 1 else ""
+    bypass_synthesis = (
+        SYNTHESIS_BYPASS_ENABLED
+        and not execution_errors
+        and bool(single_output.strip())
+        and not single_output.startswith("Error:")
+        and len(single_output) < SYNTHESIS_BYPASS_MAX_CHARS
+    )
     
     try:
-        formatted_outputs = format_agent_outputs_for_synthesis(agent_outputs, plan)
-        
-        if execution_errors:
-            formatted_outputs += f"\n\n**Notes:** {len(execution_errors)} error(s) occurred\n"
-        
-        synthesis_chain = synthesis_prompt_template | supervisor_model
-        response = synthesis_chain.invoke({
-            "question": original_question,
-            "plan_summary": plan.get("plan_summary", ""),
-            "agent_outputs": formatted_outputs
-        })
+        if bypass_synthesis:
+            logger.info("⚡ Single short agent answer - skipping synthesis")
+            content = single_output
+        else:
+            logger.info("📊 Synthesizing results from %d agent(s)...", len(agent_outputs))
+            formatted_outputs = format_agent_outputs_for_synthesis(agent_outputs, plan)
+            
+            if execution_errors:
+                formatted_outputs += f"\n\n**Notes:** {len(execution_errors)} error(s) occurred\n"
+            
+            # Stream tokens as they arrive; stream_mode="custom" consumers see them immediately
+            writer = get_stream_writer()
+            parts = []
+            chain = await asyncio.to_thread(get_chain, "synthesis")
+            async for chunk in chain.astream({
+                "question": original_question,
+                "plan_summary": plan.get("plan_summary", ""),
+                "agent_outputs": formatted_outputs
+            }):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if text:
+                    parts.append(text)
+                    writer({"synthesis": text})
+            
+            content = "".join(parts)
+        logger.info("✅ Analysis complete\n")
         
-        content = response.content if hasattr(response, 'content') else str(response)
-        print(f"✅ Analysis complete\n")
+        # Only real plans that executed without errors are worth replaying
+        query_embedding = PENDING_PLAN_EMBEDDINGS.pop(_plan_fp(original_question))
+        if not execution_errors and plan.get("_cacheable", True):
+            try:
+                await asyncio.to_thread(remember_plan, original_question, plan, query_embedding)
+            except Exception as e:
+                logger.warning("⚠️ Plan cache write failed: %s", e)
         
         return Command(
-            update={"messages": [AIMessage(content=content, name="supervisor")]},
+            update={
+                "messages": [AIMessage(content=content, name="supervisor")]
+            },
             goto="__end__"
         )
         
     except Exception as e:
-        print(f"⚠️ Synthesis error: {e}")
+        logger.warning("⚠️ Synthesis error: %s", e)
         raw_outputs = "\n\n".join([f"**{k}**:\n{v[:2000]}" for k, v in agent_outputs.items()])
         return Command(
-            update={"messages": [AIMessage(content=f"Analysis:\n\n{raw_outputs}", name="supervisor")]},
+            update={
+                "messages": [AIMessage(content=f"Analysis:\n\n{raw_outputs}", name="supervisor")]
+            },
             goto="__end__"
         )
 
 
-def content_agent_node(state: State) -> Command[Literal["supervisor"]]:
+async def content_agent_node(task: AgentTask) -> Command[Literal["supervisor", "joiner"]]:
     """Content Agent - customer feedback and sentiment analysis."""
-    messages = state["messages"]
-    query = get_latest_human_message(messages)
-    current_step_idx = state.get("current_step", 0)
-    agent_outputs = state.get("agent_outputs", {}).copy()
-    execution_errors = state.get("execution_errors", []).copy()
-    
-    enhanced_query = build_query_with_context(query, state)
+    logger.debug("🔍 CONTENT_AGENT analyzing...")
     
-    print(f"🔍 CONTENT_AGENT analyzing...")
+    cached = cached_agent_result("CONTENT_AGENT", task)
+    if cached:
+        return cached
     
     try:
-        result = content_agent.invoke(enhanced_query)
+        agent = await asyncio.to_thread(get_agent, "CONTENT_AGENT")
+        # Native async call, so parallel steps overlap on the event loop
+        async with cortex_slot():
+            result = await agent.ainvoke(task["query"])
+        # langchain_snowflake reports agent failures in the result instead of raising
+        if result.get("error"):
+            raise RuntimeError(result["error"])
         response_content = result.get("output", "")
-        print(f"   ✓ Complete ({len(response_content)} chars)")
+        logger.debug("   ✓ Complete (%d chars)", len(response_content))
+        response_content = await truncate_agent_output(response_content)
         
-        agent_outputs["CONTENT_AGENT"] = response_content
+        store_agent_result("CONTENT_AGENT", task, response_content)
         
         return Command(
             update={
                 "messages": [AIMessage(content=response_content, name="CONTENT_AGENT")],
-                "current_step": current_step_idx + 1,
-                "agent_outputs": agent_outputs
+                "agent_outputs": {step_output_key(task["step"]): response_content}
             },
-            goto="supervisor"
+            goto=task["return_to"]
         )
         
     except Exception as e:
         error_msg = f"CONTENT_AGENT error: {str(e)}"
-        print(f"   ✗ {error_msg}")
-        execution_errors.append(error_msg)
+        logger.error("   ✗ %s", error_msg)
         
         return Command(
             update={
                 "messages": [AIMessage(content=f"Error: {str(e)}", name="CONTENT_AGENT")],
-                "current_step": current_step_idx + 1,
-                "agent_outputs": agent_outputs,
-                "execution_errors": execution_errors
+                "execution_errors": [error_msg]
             },
-            goto="supervisor"
+            goto=task["return_to"]
         )
 
 
-def data_analyst_agent_node(state: State) -> Command[Literal["supervisor"]]:
+async def data_analyst_agent_node(task: AgentTask) -> Command[Literal["supervisor", "joiner"]]:
     """Data Analyst Agent - metrics and analytics."""
-    messages = state["messages"]
-    original_query = get_latest_human_message(messages)
-    current_step_idx = state.get("current_step", 0)
-    agent_outputs = state.get("agent_outputs", {}).copy()
-    execution_errors = state.get("execution_errors", []).copy()
+    query = task["query"]
+    execution_errors = []
     
-    query = build_query_with_context(original_query, state)
+    logger.debug("📊 DATA_ANALYST_AGENT analyzing...")
     
-    print(f"📊 DATA_ANALYST_AGENT analyzing...")
+    cached = cached_agent_result("DATA_ANALYST_AGENT", task)
+    if cached:
+        return cached
     
     try:
-        chunks = []
-        for chunk in data_analyst_agent.stream(query):
-            chunks.append(str(chunk))
-        
-        response_content, stream_errors = parse_agent_stream_response(chunks)
+        agent = await asyncio.to_thread(get_agent, "DATA_ANALYST_AGENT")
+        # Parse the async stream as it arrives, so parallel steps overlap on the event loop
+        async with cortex_slot():
+            response_content, stream_errors = await parse_agent_stream(agent.astream(query))
         
         if stream_errors:
-            unique_errors = list(set(stream_errors))
-            if unique_errors:
-                print(f"   ⚠️ {len(unique_errors)} error(s) during streaming")
-                execution_errors.extend([f"DATA_ANALYST: {e}" for e in unique_errors[:3]])
+            logger.warning("   ⚠️ %d error(s) during streaming", len(stream_errors))
+            execution_errors.extend([f"DATA_ANALYST: {e}" for e in list(stream_errors)[:3]])
         
-        print(f"   ✓ Complete ({len(response_content)} chars)")
+        logger.debug("   ✓ Complete (%d chars)", len(response_content))
+        response_content = await truncate_agent_output(response_content)
         
-        agent_outputs["DATA_ANALYST_AGENT"] = response_content
+        # Only cache clean answers
+        if not execution_errors:
+            store_agent_result("DATA_ANALYST_AGENT", task, response_content)
         
         return Command(
             update={
                 "messages": [AIMessage(content=response_content, name="DATA_ANALYST_AGENT")],
-                "current_step": current_step_idx + 1,
-                "agent_outputs": agent_outputs,
+                "agent_outputs": {step_output_key(task["step"]): response_content},
                 "execution_errors": execution_errors
             },
-            goto="supervisor"
+            goto=task["return_to"]
         )
         
     except Exception as e:
         error_msg = f"DATA_ANALYST_AGENT error: {str(e)}"
-        print(f"   ✗ {error_msg}")
+        logger.error("   ✗ %s", error_msg)
         execution_errors.append(error_msg)
         
         return Command(
             update={
                 "messages": [AIMessage(content=f"Error: {str(e)}", name="DATA_ANALYST_AGENT")],
-                "current_step": current_step_idx + 1,
-                "agent_outputs": agent_outputs,
                 "execution_errors": execution_errors
             },
-            goto="supervisor"
+            goto=task["return_to"]
         )
 
 
-def research_agent_node(state: State) -> Command[Literal["supervisor"]]:
+async def research_agent_node(task: AgentTask) -> Command[Literal["supervisor", "joiner"]]:
     """Research Agent - market and strategic analysis."""
-    messages = state["messages"]
-    original_query = get_latest_human_message(messages)
-    current_step_idx = state.get("current_step", 0)
-    agent_outputs = state.get("agent_outputs", {}).copy()
-    execution_errors = state.get("execution_errors", []).copy()
+    query = task["query"]
+    execution_errors = []
     
-    query = build_query_with_context(original_query, state)
+    logger.debug("🔬 RESEARCH_AGENT analyzing...")
     
-    print(f"🔬 RESEARCH_AGENT analyzing...")
+    cached = cached_agent_result("RESEARCH_AGENT", task)
+    if cached:
+        return cached
     
     try:
-        chunks = []
-        for chunk in research_agent.stream(query):
-            chunks.append(str(chunk))
-        
-        response_content, stream_errors = parse_agent_stream_response(chunks)
+        agent = await asyncio.to_thread(get_agent, "RESEARCH_AGENT")
+        # Parse the async stream as it arrives, so parallel steps overlap on the event loop
+        async with cortex_slot():
+            response_content, stream_errors = await parse_agent_stream(agent.astream(query))
         
         if stream_errors:
-            unique_errors = list(set(stream_errors))
-            if unique_errors:
-                print(f"   ⚠️ {len(unique_errors)} error(s) during streaming")
-                execution_errors.extend([f"RESEARCH: {e}" for e in unique_errors[:3]])
+            logger.warning("   ⚠️ %d error(s) during streaming", len(stream_errors))
+            execution_errors.extend([f"RESEARCH: {e}" for e in list(stream_errors)[:3]])
         
-        print(f"   ✓ Complete ({len(response_content)} chars)")
+        logger.debug("   ✓ Complete (%d chars)", len(response_content))
+        response_content = await truncate_agent_output(response_content)
         
-        agent_outputs["RESEARCH_AGENT"] = response_content
+        # Only cache clean answers
+        if not execution_errors:
+            store_agent_result("RESEARCH_AGENT", task, response_content)
         
         return Command(
             update={
                 "messages": [AIMessage(content=response_content, name="RESEARCH_AGENT")],
-                "current_step": current_step_idx + 1,
-                "agent_outputs": agent_outputs,
+                "agent_outputs": {step_output_key(task["step"]): response_content},
                 "execution_errors": execution_errors
             },
-            goto="supervisor"
+            goto=task["return_to"]
         )
         
     except Exception as e:
         error_msg = f"RESEARCH_AGENT error: {str(e)}"
-        print(f"   ✗ {error_msg}")
+        logger.error("   ✗ %s", error_msg)
         execution_errors.append(error_msg)
         
         return Command(
             update={
                 "messages": [AIMessage(content=f"Error: {str(e)}", name="RESEARCH_AGENT")],
-                "current_step": current_step_idx + 1,
-                "agent_outputs": agent_outputs,
                 "execution_errors": execution_errors
             },
-            goto="supervisor"
+            goto=task["return_to"]
         )
 
 
@@ -644,6 +1418,7 @@ workflow.add_node("supervisor", supervisor_node)
 workflow.add_node("CONTENT_AGENT", content_agent_node)
 workflow.add_node("DATA_ANALYST_AGENT", data_analyst_agent_node)
 workflow.add_node("RESEARCH_AGENT", research_agent_node)
+workflow.add_node("joiner", joiner_node)
 
 # Entry point
 workflow.add_edge(START, "supervisor")
@@ -657,20 +1432,34 @@ app = workflow.compile()
 # =============================================================================
 
 if __name__ == "__main__":
+    # Smoke-check the graph view LangGraph Studio renders before spending any Cortex calls
+    app.get_graph().draw_mermaid()
+    
     # Test query
     test_query = "What industries have the highest customer lifetime value?"
+    follow_up_query = "Which of those industries has the most at-risk customers?"
     
     print(f"\n{'='*60}")
     print(f"Testing: {test_query}")
     print(f"{'='*60}\n")
     
-    result = app.invoke({
-        "messages": [HumanMessage(content=test_query)]
-    })
+    # Two turns on one checkpointed thread, the way Studio runs a conversation:
+    # each turn must plan from its own question, not the previous turn's state
+    from langgraph.checkpoint.memory import InMemorySaver
+    threaded_app = workflow.compile(checkpointer=InMemorySaver())
+    thread_config = {"configurable": {"thread_id": "studio-app-smoke-test"}}
     
-    # Print final response
-    final_message = result["messages"][-1]
-    print(f"\n{'='*60}")
-    print("FINAL RESPONSE:")
-    print(f"{'='*60}")
-    print(final_message.content)
+    for turn_query in (test_query, follow_up_query):
+        # All nodes are async, so run the graph on an event loop
+        result = asyncio.run(threaded_app.ainvoke({
+            "messages": [HumanMessage(content=turn_query)]
+        }, thread_config))
+        assert result["original_query"] == turn_query, "turn planned from a stale query"
+        assert len(result["messages"]) <= MAX_MESSAGE_HISTORY
+        
+        # Print final response
+        final_message = result["messages"][-1]
+        print(f"\n{'='*60}")
+        print(f"FINAL RESPONSE: {turn_query}")
+        print(f"{'='*60}")
+        print(final_message.content)